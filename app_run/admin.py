@@ -1,9 +1,15 @@
 from django.contrib import admin
-from app_run.models import Run, AthleteInfo, Challenge, Position, CollectibleItem, Subscribe
+from app_run.models import Run, AthleteInfo, Challenge, Position, CollectibleItem, Subscribe, UserStats, RunTrack, Task, RunRollup, ModelVersion, RunTrackLevel
 
 admin.site.register(Run)
 admin.site.register(AthleteInfo)
 admin.site.register(Challenge)
 admin.site.register(Position)
 admin.site.register(CollectibleItem)
-admin.site.register(Subscribe)
\ No newline at end of file
+admin.site.register(Subscribe)
+admin.site.register(UserStats)
+admin.site.register(RunTrack)
+admin.site.register(Task)
+admin.site.register(RunRollup)
+admin.site.register(ModelVersion)
+admin.site.register(RunTrackLevel)
@@ -0,0 +1,69 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Set by use_replica() around code whose reads may be served by the replica.
+_replica_reads = ContextVar('replica_reads', default=False)
+# Set for requests from a client that wrote recently (see ReplicaStickinessMiddleware).
+_primary_pinned = ContextVar('primary_pinned', default=False)
+# Set by the router as soon as anything in the current context writes.
+_wrote = ContextVar('wrote', default=False)
+
+
+def replica_alias():
+    alias = getattr(settings, 'REPLICA_DATABASE', 'replica')
+    return alias if alias in settings.DATABASES else None
+
+
+@contextmanager
+def use_replica():
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def request_scope(pinned=False):
+    """Fresh routing state for one request; a pinned request reads from the primary only."""
+    pinned_token, wrote_token = _primary_pinned.set(pinned), _wrote.set(False)
+    try:
+        yield
+    finally:
+        _primary_pinned.reset(pinned_token)
+        _wrote.reset(wrote_token)
+
+
+def wrote():
+    return _wrote.get()
+
+
+class ReplicaRouter:
+    """
+    Sends reads made inside use_replica() to the replica alias, unless the
+    current context already wrote, the client wrote recently (read-your-writes),
+    or a transaction is open on the primary. Everything else uses default.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = replica_alias()
+        if alias is None or not _replica_reads.get() or _primary_pinned.get() or _wrote.get():
+            return None
+        # Inside a transaction on the primary, reads must see that transaction.
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != replica_alias()
@@ -0,0 +1,65 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from haversine import haversine, Unit
+
+from app_run.services.track_geometry_service import TrackGeometryService
+
+
+class Command(BaseCommand):
+    help = 'Compare the per-pair haversine loop with the vectorized track engine on a synthetic track.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--points', type=int, default=10_000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rows = self._synthetic_track(options['points'], options['seed'])
+
+        loop_time, loop_distance = self._best_of(options['repeat'], lambda: self._loop_distance(rows))
+        numpy_time, numpy_distance = self._best_of(options['repeat'], lambda: self._numpy_distance(rows))
+        arrays = TrackGeometryService.to_arrays(rows)
+        kernel_time, _ = self._best_of(options['repeat'], lambda: TrackGeometryService.measure(*arrays))
+
+        self.stdout.write(f'points:      {len(rows)}')
+        self.stdout.write(f'loop:        {loop_time * 1000:.2f} ms ({loop_distance:.2f} m)')
+        self.stdout.write(f'vectorized:  {numpy_time * 1000:.2f} ms ({numpy_distance:.2f} m)')
+        self.stdout.write(f'  kernel:    {kernel_time * 1000:.2f} ms (without row to array conversion)')
+        self.stdout.write(self.style.SUCCESS(f'speedup:     x{loop_time / numpy_time:.1f}'))
+
+    @staticmethod
+    def _synthetic_track(points, seed):
+        rng = np.random.default_rng(seed)
+        latitudes = 55.75 + np.cumsum(rng.normal(0, 0.0001, points))
+        longitudes = 37.62 + np.cumsum(rng.normal(0, 0.0001, points))
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        return [
+            (round(lat, 4), round(lon, 4), start + timedelta(seconds=5 * i))
+            for i, (lat, lon) in enumerate(zip(latitudes.tolist(), longitudes.tolist()))
+        ]
+
+    @staticmethod
+    def _loop_distance(rows):
+        distance = 0
+        for point in range(len(rows) - 1):
+            distance += haversine((rows[point][0], rows[point][1]), (rows[point + 1][0], rows[point + 1][1]),
+                                  unit=Unit.METERS)
+        return distance
+
+    @staticmethod
+    def _numpy_distance(rows):
+        metrics = TrackGeometryService.measure(*TrackGeometryService.to_arrays(rows))
+        return float(metrics.cumulative_distance[-1])
+
+    @staticmethod
+    def _best_of(repeat, func):
+        best, result = None, None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
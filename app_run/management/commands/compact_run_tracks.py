@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from app_run.models import Run
+from app_run.services.run_track_service import RunTrackService
+
+
+class Command(BaseCommand):
+    help = (
+        'Pack the positions of finished runs into RunTrack blobs and report the storage saved. '
+        'Positions of a compacted run are then served only by GET /api/positions/?run=<id>, as one page; '
+        'they no longer appear in the unfiltered list or under /api/positions/<id>/.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--run', type=int, action='append', dest='runs', help='Only compact these run ids.')
+        parser.add_argument('--limit', type=int, help='Compact at most this many runs.')
+
+    def handle(self, *args, **options):
+        runs = Run.objects.filter(status=Run.Status.FINISHED, track__isnull=True).order_by('id')
+        if options['runs']:
+            runs = runs.filter(id__in=options['runs'])
+        if options['limit']:
+            runs = runs[:options['limit']]
+
+        compacted = points = rows_size = blob_size = 0
+        for run in runs.iterator():
+            run_points, run_rows_size, run_blob_size = RunTrackService.compact(run)
+            compacted += 1
+            points += run_points
+            rows_size += run_rows_size
+            blob_size += run_blob_size
+
+        saved = rows_size - blob_size
+        ratio = rows_size / blob_size if blob_size else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Compacted {compacted} runs ({points} positions): '
+            f'{rows_size} bytes of rows -> {blob_size} bytes packed, saved {saved} bytes (x{ratio:.1f}).'
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app_run.services.challenge_rule_service import ChallengeRuleService
+
+
+class Command(BaseCommand):
+    help = 'Evaluate challenge rules for all athletes and award any missing challenges.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rule', action='append', dest='rules', help='Only evaluate the rule with this name.')
+
+    def handle(self, *args, **options):
+        try:
+            rules = ChallengeRuleService.get_rules(options['rules'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        ChallengeRuleService.evaluate_all(rules)
+        self.stdout.write(self.style.SUCCESS(f'Evaluated {len(rules)} rules.'))
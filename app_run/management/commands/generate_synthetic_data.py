@@ -0,0 +1,98 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from app_run.models import CollectibleItem, Position, Run, Subscribe
+from app_run.services.collectible_index_service import CollectibleIndexService
+from app_run.services.leaderboard_service import LeaderboardService
+from app_run.services.model_version_service import ModelVersionService
+from app_run.services.position_service import PositionService
+from app_run.services.run_service import RunService
+from app_run.services.user_stats_service import UserStatsService
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic dataset of coaches, athletes, runs, positions and collectible items.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--coaches', type=int, default=5)
+        parser.add_argument('--athletes', type=int, default=50)
+        parser.add_argument('--runs', type=int, default=10, help='Runs per athlete.')
+        parser.add_argument('--positions', type=int, default=200, help='Positions per run.')
+        parser.add_argument('--items', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='synthetic', help='Username/uid prefix of generated rows.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        prefix = options['prefix']
+        center = (55.75, 37.62)
+
+        with transaction.atomic():
+            coaches = User.objects.bulk_create([
+                User(username=f'{prefix}_coach_{i}', first_name='Coach', last_name=str(i), is_staff=True)
+                for i in range(options['coaches'])
+            ])
+            athletes = User.objects.bulk_create([
+                User(username=f'{prefix}_athlete_{i}', first_name='Athlete', last_name=str(i))
+                for i in range(options['athletes'])
+            ])
+            if coaches:
+                Subscribe.objects.bulk_create([
+                    Subscribe(athlete=athlete, coach=coaches[i % len(coaches)], rating=rng.randint(1, 5))
+                    for i, athlete in enumerate(athletes)
+                ])
+            CollectibleItem.objects.bulk_create([
+                CollectibleItem(
+                    name=f'Item {i}', uid=f'{prefix}-{i}', value=rng.randint(1, 100),
+                    latitude=round(center[0] + rng.uniform(-0.1, 0.1), 4),
+                    longitude=round(center[1] + rng.uniform(-0.1, 0.1), 4),
+                    picture='https://example.com/item.png',
+                )
+                for i in range(options['items'])
+            ], batch_size=1000)
+        CollectibleIndexService.invalidate()
+        ModelVersionService.bump('collectible_item')
+
+        started = timezone.now() - timedelta(days=options['runs'])
+        finished_runs = 0
+        for athlete in athletes:
+            for run_index in range(options['runs']):
+                # The last run of every athlete stays in progress so stop/ingest paths have something to work on.
+                run = Run.objects.create(athlete=athlete, comment='synthetic', status=Run.Status.IN_PROGRESS)
+                points = self._track(rng, center, started + timedelta(days=run_index), options['positions'])
+                if points:
+                    PositionService.create_batch(run, points)
+                if run_index < options['runs'] - 1:
+                    run.refresh_from_db()
+                    run.status = Run.Status.FINISHED
+                    RunService._finalize_totals(run)
+                    run.save()
+                    finished_runs += 1
+
+        UserStatsService.rebuild()
+        LeaderboardService.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {len(coaches)} coaches, {len(athletes)} athletes, '
+            f'{len(athletes) * options["runs"]} runs ({finished_runs} finished), '
+            f'{Position.objects.filter(run__athlete__in=athletes).count()} positions, {options["items"]} items.'
+        ))
+
+    @staticmethod
+    def _track(rng, center, start, count):
+        latitude = center[0] + rng.uniform(-0.05, 0.05)
+        longitude = center[1] + rng.uniform(-0.05, 0.05)
+        points = []
+        for i in range(count):
+            latitude += rng.uniform(-0.0003, 0.0003)
+            longitude += rng.uniform(-0.0003, 0.0003)
+            points.append({
+                'latitude': round(latitude, 4),
+                'longitude': round(longitude, 4),
+                'date_time': start + timedelta(seconds=5 * i),
+            })
+        return points
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app_run.services.leaderboard_service import LeaderboardService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily, weekly and monthly run rollups (leaderboards, training history) from finished runs.'
+
+    def handle(self, *args, **options):
+        rollups = LeaderboardService.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rollups} run rollups.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app_run.services.user_stats_service import UserStatsService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-user stats from finished runs and coach ratings.'
+
+    def handle(self, *args, **options):
+        athletes, coaches = UserStatsService.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt stats for {athletes} athletes and ratings for {coaches} coaches.'))
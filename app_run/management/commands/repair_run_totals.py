@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app_run.models import Run
+from app_run.services.run_service import RunService
+
+
+class Command(BaseCommand):
+    help = 'Recompute the running totals of runs from their positions and repair any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--run', type=int, action='append', dest='runs', help='Only check these run ids.')
+        parser.add_argument('--status', choices=Run.Status.values, help='Only check runs in this status.')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without saving.')
+
+    def handle(self, *args, **options):
+        runs = Run.objects.order_by('id')
+        if options['runs']:
+            runs = runs.filter(id__in=options['runs'])
+        if options['status']:
+            runs = runs.filter(status=options['status'])
+
+        checked = repaired = 0
+        for run_id in runs.values_list('id', flat=True).iterator():
+            checked += 1
+            with transaction.atomic():
+                run = Run.objects.select_for_update().get(id=run_id)
+                drifted = RunService.repair_totals(run)
+                if not drifted:
+                    continue
+                repaired += 1
+                self.stdout.write(f'Run {run.id}: {", ".join(drifted)}')
+                if not options['dry_run']:
+                    run.save()
+
+        verb = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(f'{verb} drift in {repaired} of {checked} runs.'))
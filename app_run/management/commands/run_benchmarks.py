@@ -0,0 +1,177 @@
+import json
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from app_run.models import Position, Run, Subscribe
+from app_run.services.position_service import PositionService
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive the hot endpoints through the Django test client and record latency percentiles, '
+        'query counts and peak memory as JSON. Writes to the configured database (the stop '
+        'benchmark creates runs), so point it at a scratch copy filled by generate_synthetic_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--stop-positions', type=int, default=500,
+                            help='Positions in each run created for the stop benchmark.')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+        parser.add_argument('--only', action='append', help='Only run these benchmarks.')
+
+    def handle(self, *args, **options):
+        self.client = Client()
+        self.options = options
+        benchmarks = {
+            'positions_list': self._positions_list,
+            'positions_create': self._positions_create,
+            'users_list': self._users_list,
+            'run_stop': self._run_stop,
+            'analytics_for_coach': self._analytics,
+        }
+        selected = options['only'] or list(benchmarks)
+        unknown = set(selected) - set(benchmarks)
+        if unknown:
+            raise CommandError(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+        report = {
+            'commit': self._git_commit(),
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'dataset': {
+                'users': User.objects.count(),
+                'runs': Run.objects.count(),
+                'positions': Position.objects.count(),
+            },
+            'results': {name: benchmarks[name]() for name in selected},
+        }
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    def _measure(self, request, setup=None):
+        """Time `request(state)` over the configured iterations; `setup()` runs untimed before each call."""
+        def call():
+            state = setup() if setup else None
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = request(state)
+                if getattr(response, 'streaming', False):
+                    b''.join(response.streaming_content)
+                elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                raise CommandError(f'Benchmark request failed with {response.status_code}: {response.content[:200]}')
+            return elapsed, len(queries), len(getattr(response, 'content', b'') or b'')
+
+        for _ in range(self.options['warmup']):
+            call()
+
+        latencies, query_counts, sizes = [], [], []
+        for _ in range(self.options['iterations']):
+            elapsed, query_count, size = call()
+            latencies.append(elapsed * 1000)
+            query_counts.append(query_count)
+            sizes.append(size)
+
+        # Peak memory is measured on a separate call so tracing overhead doesn't skew the latencies.
+        tracemalloc.start()
+        try:
+            call()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        latencies.sort()
+        return {
+            'latency_ms': {
+                'p50': round(self._percentile(latencies, 50), 3),
+                'p90': round(self._percentile(latencies, 90), 3),
+                'p99': round(self._percentile(latencies, 99), 3),
+                'max': round(latencies[-1], 3),
+                'mean': round(statistics.fmean(latencies), 3),
+            },
+            'queries': {'min': min(query_counts), 'max': max(query_counts)},
+            'response_bytes': round(statistics.fmean(sizes)),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+
+    @staticmethod
+    def _percentile(values, percent):
+        index = (len(values) - 1) * percent / 100
+        lower = int(index)
+        upper = min(lower + 1, len(values) - 1)
+        return values[lower] + (values[upper] - values[lower]) * (index - lower)
+
+    def _pick_run(self, status):
+        run = Run.objects.filter(status=status).order_by('-positions_count', 'id').first()
+        if run is None:
+            raise CommandError(f"No '{status}' runs found, run generate_synthetic_data first")
+        return run
+
+    def _positions_list(self):
+        run = self._pick_run(Run.Status.FINISHED)
+        return self._measure(lambda _: self.client.get(f'/api/positions/?run={run.id}'))
+
+    def _positions_create(self):
+        run = self._pick_run(Run.Status.IN_PROGRESS)
+
+        def request(_):
+            return self.client.post('/api/positions/', {
+                'run': run.id, 'latitude': 55.75, 'longitude': 37.62,
+                'date_time': timezone.now().strftime('%Y-%m-%dT%H:%M:%S.%f'),
+            }, content_type='application/json')
+        return self._measure(request)
+
+    def _users_list(self):
+        return self._measure(lambda _: self.client.get('/api/users/?size=50&ordering=date_joined'))
+
+    def _run_stop(self):
+        athlete = User.objects.filter(is_staff=False, is_superuser=False).first()
+        if athlete is None:
+            raise CommandError('No athletes found, run generate_synthetic_data first')
+        positions = self.options['stop_positions']
+
+        def setup():
+            run = Run.objects.create(athlete=athlete, comment='benchmark', status=Run.Status.IN_PROGRESS)
+            start = timezone.now() - timedelta(seconds=5 * positions)
+            PositionService.create_batch(run, [
+                {'latitude': round(55.75 + i * 0.0001, 4), 'longitude': 37.62,
+                 'date_time': start + timedelta(seconds=5 * i)}
+                for i in range(positions)
+            ], pick_up=False)
+            return run
+
+        return self._measure(lambda run: self.client.post(f'/api/runs/{run.id}/stop/'), setup=setup)
+
+    def _analytics(self):
+        coach_id = Subscribe.objects.order_by('coach_id').values_list('coach_id', flat=True).first()
+        if coach_id is None:
+            raise CommandError('No coaches with athletes found, run generate_synthetic_data first')
+        return self._measure(lambda _: self.client.get(f'/api/analytics_for_coach/{coach_id}/'))
+
+    @staticmethod
+    def _git_commit():
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,54 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from app_run.services.task_service import TaskService
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks on a thread pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to sleep when there is nothing to do.')
+        parser.add_argument('--stale-after', type=int, default=600,
+                            help='Requeue tasks left running for this many seconds by a dead worker.')
+        parser.add_argument('--once', action='store_true', help='Exit when the queue is empty.')
+
+    def handle(self, *args, **options):
+        requeued = TaskService.requeue_stale(timedelta(seconds=options['stale_after']))
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} stale tasks.')
+
+        in_flight = {}
+        processed = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                free = options['workers'] - len(in_flight)
+                tasks = TaskService.claim(free, busy_keys=in_flight.values()) if free else []
+                for task in tasks:
+                    in_flight[pool.submit(self._execute, task)] = task.ordering_key
+
+                if not in_flight:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                done, _ = wait(in_flight, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    in_flight.pop(future)
+                    processed += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} tasks.'))
+
+    @staticmethod
+    def _execute(task):
+        try:
+            return TaskService.execute(task)
+        finally:
+            close_old_connections()
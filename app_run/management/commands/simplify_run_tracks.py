@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from app_run.models import Run
+from app_run.services.track_simplification_service import TrackSimplificationService
+
+
+class Command(BaseCommand):
+    help = 'Precompute low/medium detail tracks of finished runs for map rendering.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--run', type=int, action='append', dest='runs', help='Only simplify these run ids.')
+        parser.add_argument('--limit', type=int, help='Simplify at most this many runs.')
+        parser.add_argument('--all', action='store_true', help='Rebuild runs that already have detail levels.')
+
+    def handle(self, *args, **options):
+        runs = Run.objects.filter(status=Run.Status.FINISHED).order_by('id')
+        if not options['all']:
+            runs = runs.filter(track_levels__isnull=True)
+        if options['runs']:
+            runs = runs.filter(id__in=options['runs'])
+        if options['limit']:
+            runs = runs[:options['limit']]
+
+        simplified = 0
+        points = dict.fromkeys(TrackSimplificationService.LEVELS, 0)
+        for run in runs.iterator():
+            for detail, count in TrackSimplificationService.build(run).items():
+                points[detail] += count
+            simplified += 1
+
+        levels = ', '.join(f'{detail}: {count} points' for detail, count in points.items())
+        self.stdout.write(self.style.SUCCESS(f'Simplified {simplified} runs ({levels}).'))
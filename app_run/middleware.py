@@ -0,0 +1,154 @@
+import random
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+from app_run.db_router import request_scope, wrote
+from app_run.services.metrics_service import MetricsService
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class RequestMetricsMiddleware:
+    """
+    Records latency, response size and (for sync views) SQL query count and time per
+    resolved URL route for a METRICS_SAMPLE_RATE share of requests.
+
+    Streaming responses are recorded when their body has been sent (or the response
+    is closed early): bytes are counted as they go out, and the queries that produce
+    the body are counted too, since they run while it is being iterated.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'METRICS_SAMPLE_RATE', 1.0)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with self._counting(counter):
+            response = self.get_response(request)
+        if response.streaming:
+            return self._measure_stream(request, response, started, counter)
+        self._record(request, response, time.perf_counter() - started, len(response.content), counter)
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= self.sample_rate:
+            return await self.get_response(request)
+
+        # Async views run their queries on other threads, so only latency and size are recorded here.
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        if response.streaming:
+            return self._measure_stream(request, response, started)
+        self._record(request, response, time.perf_counter() - started, len(response.content))
+        return response
+
+    @staticmethod
+    def _counting(counter):
+        stack = ExitStack()
+        if counter is not None:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+        return stack
+
+    def _measure_stream(self, request, response, started, counter=None):
+        content = response.streaming_content
+
+        # The finally blocks also run when the server closes the response before the body is exhausted.
+        if response.is_async:
+            async def measured():
+                size = 0
+                try:
+                    async for chunk in content:
+                        size += len(chunk)
+                        yield chunk
+                finally:
+                    self._record(request, response, time.perf_counter() - started, size, counter)
+        else:
+            def measured():
+                size = 0
+                try:
+                    with self._counting(counter):
+                        for chunk in content:
+                            size += len(chunk)
+                            yield chunk
+                finally:
+                    self._record(request, response, time.perf_counter() - started, size, counter)
+
+        response.streaming_content = measured()
+        return response
+
+    @staticmethod
+    def _record(request, response, duration, size, counter=None):
+        match = request.resolver_match
+        route = match.route if match else 'unmatched'
+        MetricsService.record(
+            route=route,
+            method=request.method,
+            status_code=response.status_code,
+            duration=duration,
+            response_size=size,
+            queries=counter.count if counter else None,
+            sql_seconds=counter.seconds if counter else None,
+        )
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Read-your-writes for replica routing: a request that writes (or isn't a safe
+    method) sets a short-lived cookie, and requests carrying it read from the primary
+    until the replica has had REPLICA_STICKY_SECONDS to catch up.
+    """
+    sync_capable = True
+    async_capable = True
+    COOKIE_NAME = 'db_primary'
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sticky_seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with request_scope(pinned=self.COOKIE_NAME in request.COOKIES):
+            response = self.get_response(request)
+            return self._stick(request, response)
+
+    async def __acall__(self, request):
+        with request_scope(pinned=self.COOKIE_NAME in request.COOKIES):
+            response = await self.get_response(request)
+            return self._stick(request, response)
+
+    def _stick(self, request, response):
+        if wrote() or request.method not in self.SAFE_METHODS:
+            response.set_cookie(self.COOKIE_NAME, '1', max_age=self.sticky_seconds, httponly=True, samesite='Lax')
+        return response
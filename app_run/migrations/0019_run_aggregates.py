@@ -0,0 +1,77 @@
+# Generated by Django 5.2 on 2026-10-18 18:06
+
+from django.db import migrations, models
+from haversine import haversine, Unit
+
+
+def backfill_in_progress_totals(apps, schema_editor):
+    # Runs in progress keep chaining from these totals, so they must cover the fixes already stored.
+    Run = apps.get_model('app_run', 'Run')
+    Position = apps.get_model('app_run', 'Position')
+
+    for run in Run.objects.select_for_update().filter(status='in_progress').only('id').iterator():
+        positions = (
+            Position.objects
+            .filter(run_id=run.id)
+            .order_by('date_time', 'id')
+            .values_list('latitude', 'longitude', 'date_time', 'speed')
+        )
+        totals = {'track_distance': 0.0, 'speed_sum': 0.0, 'positions_count': 0}
+        for latitude, longitude, date_time, speed in positions.iterator(chunk_size=2000):
+            if totals['positions_count']:
+                previous = (float(totals['last_latitude']), float(totals['last_longitude']))
+                totals['track_distance'] += haversine(previous, (float(latitude), float(longitude)), unit=Unit.METERS)
+            else:
+                totals['first_position_at'] = date_time
+            totals['last_latitude'], totals['last_longitude'] = latitude, longitude
+            totals['last_position_at'] = date_time
+            totals['speed_sum'] += speed
+            totals['positions_count'] += 1
+        if totals['positions_count']:
+            Run.objects.filter(id=run.id).update(**totals)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_run', '0018_alter_subscribe_rating'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='run',
+            name='first_position_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='run',
+            name='last_latitude',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=6, null=True),
+        ),
+        migrations.AddField(
+            model_name='run',
+            name='last_longitude',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=7, null=True),
+        ),
+        migrations.AddField(
+            model_name='run',
+            name='last_position_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='run',
+            name='positions_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='run',
+            name='speed_sum',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='run',
+            name='track_distance',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.RunPython(backfill_in_progress_totals, migrations.RunPython.noop),
+    ]
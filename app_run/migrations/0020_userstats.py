@@ -0,0 +1,51 @@
+# Generated by Django 5.2 on 2026-10-18 18:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_user_stats(apps, schema_editor):
+    Run = apps.get_model('app_run', 'Run')
+    UserStats = apps.get_model('app_run', 'UserStats')
+    rows = (
+        Run.objects
+        .filter(status='finished')
+        .values('athlete_id')
+        .annotate(
+            runs=Count('id'),
+            total=Coalesce(Sum('distance'), 0.0),
+            longest=Max('distance'),
+            speed=Coalesce(Sum('speed'), 0.0),
+        )
+    )
+    UserStats.objects.bulk_create([
+        UserStats(user_id=row['athlete_id'], runs_finished=row['runs'], total_distance=row['total'],
+                  max_distance=row['longest'], speed_sum=row['speed'])
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_run', '0019_run_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('runs_finished', models.PositiveIntegerField(default=0)),
+                ('total_distance', models.FloatField(default=0.0)),
+                ('max_distance', models.FloatField(blank=True, null=True)),
+                ('speed_sum', models.FloatField(default=0.0)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(backfill_user_stats, migrations.RunPython.noop),
+    ]
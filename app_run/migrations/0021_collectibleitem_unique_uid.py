@@ -0,0 +1,49 @@
+# Generated by Django 5.2 on 2026-10-18 18:08
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_uids(apps, schema_editor):
+    CollectibleItem = apps.get_model('app_run', 'CollectibleItem')
+    Through = CollectibleItem.athletes.through
+
+    duplicates = (
+        CollectibleItem.objects
+        .values('uid')
+        .annotate(keep_id=Min('id'), copies=Count('id'))
+        .filter(copies__gt=1)
+    )
+    for row in duplicates:
+        extra_ids = list(
+            CollectibleItem.objects
+            .filter(uid=row['uid'])
+            .exclude(id=row['keep_id'])
+            .values_list('id', flat=True)
+        )
+        athlete_ids = set(
+            Through.objects
+            .filter(collectibleitem_id__in=extra_ids)
+            .values_list('user_id', flat=True)
+        )
+        Through.objects.bulk_create(
+            [Through(collectibleitem_id=row['keep_id'], user_id=athlete_id) for athlete_id in athlete_ids],
+            ignore_conflicts=True
+        )
+        CollectibleItem.objects.filter(id__in=extra_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_run', '0020_userstats'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_uids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='collectibleitem',
+            name='uid',
+            field=models.CharField(max_length=100, unique=True),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-18 18:09
+
+from django.db import migrations, models
+from django.db.models import Avg
+
+
+def backfill_ratings(apps, schema_editor):
+    Subscribe = apps.get_model('app_run', 'Subscribe')
+    UserStats = apps.get_model('app_run', 'UserStats')
+    ratings = (
+        Subscribe.objects
+        .filter(rating__isnull=False)
+        .values('coach_id')
+        .annotate(avg_rating=Avg('rating'))
+    )
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=row['coach_id'], rating=row['avg_rating']) for row in ratings],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['rating'],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_run', '0021_collectibleitem_unique_uid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='rating',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-18 18:10
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Min
+
+
+def delete_duplicate_awards(apps, schema_editor):
+    Challenge = apps.get_model('app_run', 'Challenge')
+    keep_ids = (
+        Challenge.objects
+        .values('athlete_id', 'full_name')
+        .annotate(keep_id=Min('id'))
+        .values_list('keep_id', flat=True)
+    )
+    Challenge.objects.exclude(id__in=list(keep_ids)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_run', '0022_userstats_rating'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_awards, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='challenge',
+            unique_together={('athlete', 'full_name')},
+        ),
+    ]
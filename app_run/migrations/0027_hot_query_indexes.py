@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 18:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_run', '0026_task'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='run',
+            index=models.Index(fields=['athlete', 'status', 'created_at', 'id'], name='run_athlete_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subscribe',
+            index=models.Index(fields=['coach', 'athlete'], name='subscribe_coach_athlete_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-18 18:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_run', '0030_modelversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RunTrackLevel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('detail', models.CharField(choices=[('low', 'Low'), ('medium', 'Medium')], max_length=10)),
+                ('tolerance', models.FloatField()),
+                ('points_count', models.PositiveIntegerField()),
+                ('data', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='track_levels', to='app_run.run')),
+            ],
+            options={
+                'unique_together': {('run', 'detail')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-18 18:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_run', '0031_runtracklevel'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='run',
+            name='moving_time',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='runrollup',
+            name='best_speed',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='runrollup',
+            name='moving_time',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AlterField(
+            model_name='runrollup',
+            name='period',
+            field=models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('month', 'Month')], max_length=10),
+        ),
+    ]
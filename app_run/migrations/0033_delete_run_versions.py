@@ -0,0 +1,20 @@
+# Generated by Django 5.2 on 2026-10-18 19:40
+
+from django.db import migrations
+
+
+def delete_run_versions(apps, schema_editor):
+    # Run details derive their ETag from the run row; the per-run counters are no longer read.
+    ModelVersion = apps.get_model('app_run', 'ModelVersion')
+    ModelVersion.objects.filter(name__startswith='run:').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_run', '0032_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_run_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-18 18:54
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def backfill_best_2km_time(apps, schema_editor):
+    Run = apps.get_model('app_run', 'Run')
+    UserStats = apps.get_model('app_run', 'UserStats')
+    rows = (
+        Run.objects
+        .filter(status='finished', distance__gte=2)
+        .values('athlete_id')
+        .annotate(best_time=Min('run_time_seconds'))
+    )
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=row['athlete_id'], best_2km_time=row['best_time']) for row in rows],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['best_2km_time'],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_run', '0033_delete_run_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='best_2km_time',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_best_2km_time, migrations.RunPython.noop),
+    ]
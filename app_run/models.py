@@ -23,6 +23,27 @@ class Run(models.Model):
     run_time_seconds = models.PositiveIntegerField(default=0)
     speed = models.FloatField(default=0.0)
 
+    # Running totals, updated as positions arrive and finalized on stop.
+    track_distance = models.FloatField(default=0.0)
+    first_position_at = models.DateTimeField(null=True, blank=True)
+    last_position_at = models.DateTimeField(null=True, blank=True)
+    last_latitude = models.DecimalField(max_digits=6, decimal_places=4, null=True, blank=True)
+    last_longitude = models.DecimalField(max_digits=7, decimal_places=4, null=True, blank=True)
+    speed_sum = models.FloatField(default=0.0)
+    positions_count = models.PositiveIntegerField(default=0)
+    moving_time = models.FloatField(default=0.0)
+
+    AGGREGATE_FIELDS = [
+        'track_distance', 'first_position_at', 'last_position_at',
+        'last_latitude', 'last_longitude', 'speed_sum', 'positions_count', 'moving_time'
+    ]
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='run_created_at_id_idx'),
+            models.Index(fields=['athlete', 'status', 'created_at', 'id'], name='run_athlete_status_created_idx'),
+        ]
+
 
 class AthleteInfo(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='info')
@@ -30,10 +51,50 @@ class AthleteInfo(models.Model):
     weight = models.IntegerField(null=True, blank=True)
 
 
+class UserStats(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='stats')
+    runs_finished = models.PositiveIntegerField(default=0)
+    total_distance = models.FloatField(default=0.0)
+    max_distance = models.FloatField(null=True, blank=True)
+    speed_sum = models.FloatField(default=0.0)
+    rating = models.FloatField(null=True, blank=True)
+    # Shortest run_time_seconds of a finished run of at least 2 km.
+    best_2km_time = models.PositiveIntegerField(null=True, blank=True)
+
+
+class RunRollup(models.Model):
+    """Finished-run totals of one athlete for one calendar period, kept up to date on stop."""
+    class Period(models.TextChoices):
+        DAY = 'day', 'Day'
+        WEEK = 'week', 'Week'
+        MONTH = 'month', 'Month'
+
+    athlete = models.ForeignKey(User, on_delete=models.CASCADE, related_name='rollups')
+    period = models.CharField(max_length=10, choices=Period.choices)
+    period_start = models.DateField()
+    runs_count = models.PositiveIntegerField(default=0)
+    distance = models.FloatField(default=0.0)
+    speed_sum = models.FloatField(default=0.0)
+    moving_time = models.FloatField(default=0.0)
+    best_speed = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ['athlete', 'period', 'period_start']
+        indexes = [
+            models.Index(fields=['period', 'period_start'], name='rollup_period_start_idx'),
+        ]
+
+
 class Challenge(models.Model):
     full_name = models.CharField(max_length=200)
     athlete = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    class Meta:
+        unique_together = ['athlete', 'full_name']
+        indexes = [
+            models.Index(fields=['full_name', 'athlete'], name='challenge_name_athlete_idx'),
+        ]
+
 
 class Position(models.Model):
     run = models.ForeignKey(Run, on_delete=models.CASCADE)
@@ -43,10 +104,39 @@ class Position(models.Model):
     speed = models.FloatField(default=0.0)
     distance = models.FloatField(default=0.0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['run', 'date_time', 'id'], name='position_run_date_time_id_idx'),
+        ]
+
+
+class RunTrack(models.Model):
+    run = models.OneToOneField(Run, on_delete=models.CASCADE, related_name='track')
+    points_count = models.PositiveIntegerField()
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class RunTrackLevel(models.Model):
+    """A simplified copy of a finished run's track for zoomed-out maps, packed like RunTrack."""
+    class Detail(models.TextChoices):
+        LOW = 'low', 'Low'
+        MEDIUM = 'medium', 'Medium'
+
+    run = models.ForeignKey(Run, on_delete=models.CASCADE, related_name='track_levels')
+    detail = models.CharField(max_length=10, choices=Detail.choices)
+    tolerance = models.FloatField()
+    points_count = models.PositiveIntegerField()
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['run', 'detail']
+
 
 class CollectibleItem(models.Model):
     name = models.CharField(max_length=200)
-    uid = models.CharField(max_length=100)
+    uid = models.CharField(max_length=100, unique=True)
     latitude = models.DecimalField(max_digits=6, decimal_places=4)
     longitude = models.DecimalField(max_digits=7, decimal_places=4)
     picture = models.URLField()
@@ -72,4 +162,40 @@ class Subscribe(models.Model):
     )
 
     class Meta:
-        unique_together = ['athlete', 'coach']
\ No newline at end of file
+        unique_together = ['athlete', 'coach']
+        indexes = [
+            models.Index(fields=['coach', 'athlete'], name='subscribe_coach_athlete_idx'),
+        ]
+
+
+class Task(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    # Tasks sharing an ordering key run one at a time, in creation order.
+    ordering_key = models.CharField(max_length=100, blank=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after', 'id'], name='task_status_run_after_id_idx'),
+            models.Index(fields=['ordering_key', 'status', 'id'], name='task_ordering_key_status_idx'),
+        ]
+
+
+class ModelVersion(models.Model):
+    """Change counter bumped on writes; conditional GETs compare it instead of reading the data."""
+    name = models.CharField(max_length=100, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
@@ -0,0 +1,51 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over (timestamp, id), backed by matching composite indexes.
+
+    Enabled by passing `size` and/or `cursor`; without either the endpoint stays unpaginated.
+    """
+    cursor_query_param = 'cursor'
+    page_size = None
+    default_cursor_page_size = 100
+    page_size_query_param = 'size'
+    max_page_size = 1000
+
+    def get_page_size(self, request):
+        page_size = super().get_page_size(request)
+        if page_size is None and self.cursor_query_param in request.query_params:
+            return self.default_cursor_page_size
+        return page_size
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        # Keep the id tie-breaker when an OrderingFilter only asked for the timestamp.
+        if not any(field.lstrip('-') == 'id' for field in ordering):
+            ordering += ('-id' if ordering[0].startswith('-') else 'id',)
+        return ordering
+
+
+class RunPagination(KeysetPagination):
+    """Page-number pagination as before, or keyset pagination when `cursor` is passed."""
+    ordering = ('created_at', 'id')
+
+    class LegacyPagination(PageNumberPagination):
+        page_size_query_param = 'size'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            self.legacy = None
+            return super().paginate_queryset(queryset, request, view)
+        self.legacy = self.LegacyPagination()
+        return self.legacy.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.legacy is not None:
+            return self.legacy.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class PositionPagination(KeysetPagination):
+    ordering = ('date_time', 'id')
@@ -34,7 +34,7 @@ class RunSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Run
-        fields = '__all__'
+        exclude = Run.AGGREGATE_FIELDS
 
 
 class ChallengeSerializer(serializers.ModelSerializer):
@@ -67,10 +67,28 @@ class PositionSerializer(serializers.ModelSerializer):
         return longitude
 
 
+class PositionBatchItemSerializer(PositionSerializer):
+    class Meta(PositionSerializer.Meta):
+        fields = ['latitude', 'longitude', 'date_time']
+
+
+class PositionBatchSerializer(serializers.Serializer):
+    run = serializers.PrimaryKeyRelatedField(queryset=Run.objects.all())
+    # Items are validated one by one in the view, so a malformed item is reported under its index.
+    positions = serializers.ListField(child=serializers.JSONField(), allow_empty=False, max_length=1000)
+
+    def validate_run(self, run):
+        if run.status != Run.Status.IN_PROGRESS:
+            raise serializers.ValidationError('Отрпавить координаты можно только для забега в статусе "in_process"', code=status.HTTP_400_BAD_REQUEST)
+        return run
+
+
 class CollectibleItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = CollectibleItem
         fields = ['id', 'name', 'uid', 'latitude', 'longitude', 'picture', 'value']
+        # Imports upsert by uid, so an existing uid is not a validation error.
+        extra_kwargs = {'uid': {'validators': []}}
 
 
 class UserForCollectibleItemSerializer(UserSerializer):
@@ -88,7 +106,7 @@ class UserForCoachSerializer(UserForCollectibleItemSerializer):
         fields = UserForCollectibleItemSerializer.Meta.fields + ['athletes']
 
     def get_athletes(self, obj):
-        return list(obj.subscribers.values_list("athlete_id", flat=True))
+        return [subscribe.athlete_id for subscribe in obj.subscribers.all()]
 
 
 class UserForAthleteSerializer(UserForCollectibleItemSerializer):
@@ -98,7 +116,7 @@ class UserForAthleteSerializer(UserForCollectibleItemSerializer):
         fields = UserForCollectibleItemSerializer.Meta.fields + ['coach']
 
     def get_coach(self, obj):
-        coaches = list(obj.subscriptions.values_list("coach_id", flat=True))
+        coaches = [subscribe.coach_id for subscribe in obj.subscriptions.all()]
         if len(coaches):
             return coaches[0]
         else:
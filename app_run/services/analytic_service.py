@@ -1,45 +1,28 @@
-from app_run.models import Subscribe, Run
-from django.db.models import Sum, Avg
+from app_run.db_router import use_replica
+from app_run.models import UserStats
 
 
 class AnalyticsService:
     @staticmethod
     def get_coach_analytics(coach_id: int):
-        athlete_ids = Subscribe.objects.filter(coach_id=coach_id).values_list('athlete_id', flat=True)
+        with use_replica():
+            roster = list(
+                UserStats.objects
+                .filter(user__subscriptions__coach_id=coach_id, runs_finished__gt=0)
+                .values_list('user_id', 'max_distance', 'total_distance', 'speed_sum', 'runs_finished')
+            )
 
-        longest_run = (
-            Run.objects
-            .filter(athlete_id__in=athlete_ids, status=Run.Status.FINISHED)
-            .order_by('-distance')
-            .values('athlete_id', 'distance')
-            .first()
-        )
-
-        total_run = (
-            Run.objects
-            .filter(athlete_id__in=athlete_ids, status=Run.Status.FINISHED)
-            .values('athlete_id')
-            .annotate(total_distance=Sum('distance'))
-            .order_by('-total_distance')
-            .first()
-        )
-
-        speed_avg = (
-            Run.objects
-            .filter(athlete_id__in=athlete_ids, status=Run.Status.FINISHED)
-            .values('athlete_id')
-            .annotate(avg_speed_m_s=Avg('speed'))
-            .order_by('-avg_speed_m_s')
-            .first()
-        )
+        longest_run = max(roster, key=lambda row: row[1] or 0, default=None)
+        total_run = max(roster, key=lambda row: row[2], default=None)
+        speed_avg = max(roster, key=lambda row: row[3] / row[4], default=None)
 
         return {
-            "longest_run_user": longest_run["athlete_id"] if longest_run else None,
-            "longest_run_value": longest_run["distance"] if longest_run else None,
+            "longest_run_user": longest_run[0] if longest_run else None,
+            "longest_run_value": longest_run[1] if longest_run else None,
 
-            "total_run_user": total_run["athlete_id"] if total_run else None,
-            "total_run_value": total_run["total_distance"] if total_run else None,
+            "total_run_user": total_run[0] if total_run else None,
+            "total_run_value": total_run[2] if total_run else None,
 
-            "speed_avg_user": speed_avg["athlete_id"] if speed_avg else None,
-            "speed_avg_value": speed_avg["avg_speed_m_s"] if speed_avg else None,
-        }
\ No newline at end of file
+            "speed_avg_user": speed_avg[0] if speed_avg else None,
+            "speed_avg_value": speed_avg[3] / speed_avg[4] if speed_avg else None,
+        }
@@ -0,0 +1,71 @@
+from typing import NamedTuple
+
+from django.db.models import Q, BooleanField, ExpressionWrapper
+
+from app_run.models import Challenge, UserStats
+from app_run.services.model_version_service import ModelVersionService
+
+
+class ChallengeRule(NamedTuple):
+    name: str
+    # Condition over UserStats fields, so bulk re-evaluation only reads the stats table.
+    condition: Q
+
+
+class ChallengeRuleService:
+    RULES = [
+        ChallengeRule("Сделай 10 Забегов!", Q(runs_finished__gte=10)),
+        ChallengeRule("Пробеги 50 километров!", Q(total_distance__gte=50)),
+        ChallengeRule("2 километра за 10 минут!", Q(best_2km_time__lte=600)),
+    ]
+    BATCH_SIZE = 1000
+
+    @classmethod
+    def get_rules(cls, names=None):
+        if not names:
+            return list(cls.RULES)
+        rules = [rule for rule in cls.RULES if rule.name in names]
+        unknown = set(names) - {rule.name for rule in rules}
+        if unknown:
+            raise ValueError(f"Unknown challenge rules: {', '.join(sorted(unknown))}")
+        return rules
+
+    @staticmethod
+    def _matching(queryset, rules):
+        if not rules:
+            return []
+        flags = queryset.values(**{
+            f'rule_{index}': ExpressionWrapper(rule.condition, output_field=BooleanField())
+            for index, rule in enumerate(rules)
+        }).first() or {}
+        return [rule for index, rule in enumerate(rules) if flags.get(f'rule_{index}')]
+
+    @classmethod
+    def evaluate_run(cls, run):
+        # The run is already counted in its athlete's stats when this runs.
+        matched = cls._matching(UserStats.objects.filter(user_id=run.athlete_id), cls.RULES)
+        cls.award([(run.athlete_id, rule.name) for rule in matched])
+        return matched
+
+    @classmethod
+    def evaluate_all(cls, rules=None):
+        for rule in rules or cls.RULES:
+            athlete_ids = UserStats.objects.filter(rule.condition).values_list('user_id', flat=True)
+
+            batch = []
+            for athlete_id in athlete_ids.iterator(chunk_size=cls.BATCH_SIZE):
+                batch.append((athlete_id, rule.name))
+                if len(batch) >= cls.BATCH_SIZE:
+                    cls.award(batch)
+                    batch = []
+            cls.award(batch)
+
+    @staticmethod
+    def award(awards):
+        if not awards:
+            return
+        Challenge.objects.bulk_create(
+            [Challenge(athlete_id=athlete_id, full_name=name) for athlete_id, name in awards],
+            ignore_conflicts=True
+        )
+        ModelVersionService.bump('challenge')
@@ -1,22 +1,80 @@
-from collections import defaultdict
+from django.core.cache import cache
+from django.db.models import Count, F, Value, Window
+from django.db.models.functions import Concat, RowNumber
 
 from app_run.models import Challenge
+from app_run.services.model_version_service import ModelVersionService
 
 
 class ChallengeSummaryService:
+    """
+    Per-challenge lists of awarded athletes, grouped and paginated in the database.
+
+    Pages are cached under the shared 'challenge' and 'user' model versions, so an
+    award made by any process (the task worker included) or a renamed athlete moves
+    every process to new keys and stale pages are simply never read again.
+    """
+    CACHE_PREFIX = 'challenge_summary'
+    VERSIONS = ['challenge', 'user']
+    # Only bounds how long pages of old versions take up cache memory.
+    CACHE_TIMEOUT = 300
+    DEFAULT_LIMIT = 100
+    MAX_LIMIT = 1000
+
+    @classmethod
+    def parse_page(cls, limit=None, offset=None):
+        try:
+            limit = cls.DEFAULT_LIMIT if limit in (None, '') else int(limit)
+            offset = 0 if offset in (None, '') else int(offset)
+        except (TypeError, ValueError):
+            raise ValueError("limit and offset must be integers")
+        if limit < 1 or offset < 0:
+            raise ValueError("limit must be positive and offset must not be negative")
+        return min(limit, cls.MAX_LIMIT), offset
+
+    @classmethod
+    def get_grouped_challenges(cls, limit=None, offset=None):
+        limit, offset = cls.parse_page(limit, offset)
+        versions = ModelVersionService.get_versions(cls.VERSIONS)
+        generation = ':'.join(str(versions[name][0]) for name in cls.VERSIONS)
+        key = f'{cls.CACHE_PREFIX}:{generation}:{limit}:{offset}'
+        summary = cache.get(key)
+        if summary is None:
+            summary = cls._build(limit, offset)
+            cache.set(key, summary, timeout=cls.CACHE_TIMEOUT)
+        return summary
+
     @staticmethod
-    def get_grouped_challenges():
-        challenges = Challenge.objects.select_related('athlete').all()
-        grouped = defaultdict(list)
-        for i in challenges:
-            athlete_data = {
-                'id': i.athlete_id,
-                'full_name': f"{i.athlete.first_name} {i.athlete.last_name}",
-                'username': i.athlete.username
-            }
-            grouped[i.athlete.full_name].append(athlete_data)
-
-        return [
-            {'name_to_display': name, 'athletes': athletes}
-            for name, athletes in grouped.items()
-        ]
\ No newline at end of file
+    def _build(limit, offset):
+        counts = (
+            Challenge.objects
+            .values('full_name')
+            .annotate(athletes_count=Count('id'))
+            .order_by('full_name')
+        )
+        summary = {
+            row['full_name']: {'name_to_display': row['full_name'], 'athletes_count': row['athletes_count'],
+                               'athletes': []}
+            for row in counts
+        }
+
+        athletes = (
+            Challenge.objects
+            .annotate(position=Window(RowNumber(), partition_by=F('full_name'), order_by=F('athlete_id').asc()))
+            .filter(position__gt=offset, position__lte=offset + limit)
+            .order_by('full_name', 'athlete_id')
+            .values(
+                'full_name', 'athlete_id', 'athlete__username',
+                athlete_full_name=Concat('athlete__first_name', Value(' '), 'athlete__last_name'),
+            )
+        )
+        for row in athletes:
+            if row['full_name'] not in summary:
+                continue  # awarded between the two queries; it shows up once its version bump is visible
+            summary[row['full_name']]['athletes'].append({
+                'id': row['athlete_id'],
+                'full_name': row['athlete_full_name'],
+                'username': row['athlete__username'],
+            })
+
+        return list(summary.values())
@@ -0,0 +1,124 @@
+import csv
+import io
+import json
+import zlib
+from itertools import islice
+
+from django.db.models import Exists, OuterRef
+
+from app_run.models import Position, Run, RunTrack, Subscribe
+from app_run.services.run_track_service import RunTrackService
+
+
+class CoachExportService:
+    """
+    Streams every run and position of a coach's roster as CSV or NDJSON.
+
+    Rows come from three forward-only queries (positions joined with their run,
+    packed tracks, runs without positions) iterated with server-side cursors where
+    the database supports them, and are written out CHUNK_SIZE rows at a time, so
+    memory stays bounded by a chunk and one decoded track whatever the export size.
+    """
+    CHUNK_SIZE = 500
+    CURSOR_CHUNK_SIZE = 2000
+    # Packed tracks are fetched with their blobs; keep fewer of them in memory at once.
+    TRACK_CHUNK_SIZE = 50
+    CONTENT_TYPES = {
+        'csv': 'text/csv; charset=utf-8',
+        'ndjson': 'application/x-ndjson',
+    }
+    RUN_FIELDS = ['athlete_id', 'athlete__username', 'id', 'status', 'created_at', 'distance',
+                  'run_time_seconds', 'speed']
+    POSITION_FIELDS = ['latitude', 'longitude', 'date_time', 'speed', 'distance']
+    COLUMNS = ['athlete_id', 'username', 'run_id', 'run_status', 'run_created_at', 'run_distance',
+               'run_time_seconds', 'run_speed', 'latitude', 'longitude', 'date_time', 'speed', 'distance']
+
+    @staticmethod
+    def get_roster(coach_id):
+        return list(Subscribe.objects.filter(coach_id=coach_id).order_by('athlete_id').values_list('athlete_id', flat=True))
+
+    @classmethod
+    def iter_rows(cls, roster):
+        run_fields = [f'run__{field}' for field in cls.RUN_FIELDS]
+
+        yield from (
+            Position.objects
+            .filter(run__athlete_id__in=roster)
+            .order_by('run_id', 'date_time', 'id')
+            .values_list(*run_fields, *cls.POSITION_FIELDS)
+            .iterator(chunk_size=cls.CURSOR_CHUNK_SIZE)
+        )
+
+        tracks = (
+            RunTrack.objects
+            .filter(run__athlete_id__in=roster)
+            .order_by('run_id')
+            .values_list(*run_fields, 'data')
+            .iterator(chunk_size=cls.TRACK_CHUNK_SIZE)
+        )
+        for *run, data in tracks:
+            for row in RunTrackService.as_rows(RunTrackService.decode(data)):
+                yield *run, *row
+
+        empty_runs = (
+            Run.objects
+            .filter(athlete_id__in=roster, track__isnull=True)
+            .exclude(Exists(Position.objects.filter(run_id=OuterRef('pk'))))
+            .order_by('id')
+            .values_list(*cls.RUN_FIELDS)
+            .iterator(chunk_size=cls.CURSOR_CHUNK_SIZE)
+        )
+        for run in empty_runs:
+            yield *run, *[None] * len(cls.POSITION_FIELDS)
+
+    @classmethod
+    def stream(cls, coach_id, fmt, gzip=False):
+        rows = cls.iter_rows(cls.get_roster(coach_id))
+        chunks = (chunk.encode() for chunk in getattr(cls, f'_write_{fmt}')(rows))
+        return cls._gzip(chunks) if gzip else chunks
+
+    @classmethod
+    def _chunks(cls, rows):
+        rows = iter(rows)
+        while chunk := list(islice(rows, cls.CHUNK_SIZE)):
+            yield chunk
+
+    @staticmethod
+    def _format(value):
+        if value is None:
+            return ''
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return str(value)
+
+    @classmethod
+    def _write_csv(cls, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(cls.COLUMNS)
+        for chunk in cls._chunks(rows):
+            writer.writerows([cls._format(value) for value in row] for row in chunk)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    @classmethod
+    def _write_ndjson(cls, rows):
+        for chunk in cls._chunks(rows):
+            yield ''.join(
+                json.dumps({
+                    column: value if isinstance(value, (int, float)) or value is None else cls._format(value)
+                    for column, value in zip(cls.COLUMNS, row)
+                }) + '\n'
+                for row in chunk
+            )
+
+    @staticmethod
+    def _gzip(chunks):
+        compressor = zlib.compressobj(wbits=31)
+        for chunk in chunks:
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
@@ -0,0 +1,171 @@
+import math
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+from haversine import haversine, Unit
+
+from app_run.models import CollectibleItem
+from app_run.services.model_version_service import ModelVersionService
+from app_run.services.track_geometry_service import TrackGeometryService
+
+
+class CollectibleIndexService:
+    """
+    In-memory grid index over collectible item coordinates.
+
+    Items are bucketed into CELL_SIZE x CELL_SIZE degree cells, so a pickup
+    check only measures the items in the cells around a fix instead of the
+    whole CollectibleItem table. The index is built lazily and tagged with the
+    shared 'collectible_item' model version; other processes (the task worker,
+    other web workers) notice a bump within VERSION_CHECK_INTERVAL seconds and
+    rebuild, while invalidate() drops the index of the current process at once.
+
+    Pickups are tested against the segments between consecutive fixes, so an
+    item the runner passed between two sparse fixes is still collected.
+    """
+    PICKUP_RADIUS_M = 100
+    # Longer gaps are GPS jumps or pauses, not a straight line that was actually run.
+    MAX_SEGMENT_M = 1_000
+    SEGMENT_CHUNK = 256
+    CELL_SIZE = 0.01
+    METERS_PER_DEGREE = 111_195
+    VERSION = 'collectible_item'
+    VERSION_CHECK_INTERVAL = 5.0
+
+    _cells = None
+    _version = None
+    _checked_at = 0.0
+    _generation = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def invalidate(cls):
+        with cls._lock:
+            cls._generation += 1
+            cls._cells = None
+
+    @classmethod
+    def _cell_key(cls, latitude, longitude):
+        lon_cells = round(360 / cls.CELL_SIZE)
+        return (
+            math.floor((latitude + 90) / cls.CELL_SIZE),
+            math.floor((longitude + 180) / cls.CELL_SIZE) % lon_cells
+        )
+
+    @classmethod
+    def _build(cls):
+        cells = defaultdict(list)
+        items = CollectibleItem.objects.values_list('id', 'latitude', 'longitude').iterator()
+        for item_id, latitude, longitude in items:
+            latitude, longitude = float(latitude), float(longitude)
+            cells[cls._cell_key(latitude, longitude)].append((item_id, latitude, longitude))
+        return dict(cells)
+
+    @classmethod
+    def _get_cells(cls):
+        cells = cls._cells
+        if cells is not None and time.monotonic() - cls._checked_at < cls.VERSION_CHECK_INTERVAL:
+            return cells
+
+        generation = cls._generation
+        # Read before building: a bump that lands during the build leaves the index one version behind.
+        version = ModelVersionService.get_versions([cls.VERSION])[cls.VERSION][0]
+        if cells is not None and version == cls._version:
+            cls._checked_at = time.monotonic()
+            return cells
+
+        cells = cls._build()
+        with cls._lock:
+            # Only publish the result if nothing invalidated the index while it was being built.
+            if cls._generation == generation:
+                cls._cells, cls._version, cls._checked_at = cells, version, time.monotonic()
+        return cells
+
+    @classmethod
+    def _box_keys(cls, min_latitude, min_longitude, max_latitude, max_longitude, radius):
+        lat_span = radius / cls.METERS_PER_DEGREE
+        cos_lat = max(min(math.cos(math.radians(min_latitude)), math.cos(math.radians(max_latitude))), 1e-6)
+        lon_span = min(radius / (cls.METERS_PER_DEGREE * cos_lat), 180)
+
+        min_lat, min_lon = cls._cell_key(max(min_latitude - lat_span, -90), min_longitude - lon_span)
+        max_lat, max_lon = cls._cell_key(min(max_latitude + lat_span, 90), max_longitude + lon_span)
+        lon_cells = round(360 / cls.CELL_SIZE)
+        lon_count = (max_lon - min_lon) % lon_cells + 1
+        for lat_key in range(min_lat, max_lat + 1):
+            for step in range(lon_count):
+                yield lat_key, (min_lon + step) % lon_cells
+
+    @classmethod
+    def _segments(cls, points, path):
+        """Isolated fixes become zero-length segments; consecutive fixes of `path` are joined."""
+        points = [(float(latitude), float(longitude)) for latitude, longitude in points]
+        path = [(float(latitude), float(longitude)) for latitude, longitude in path]
+        segments = [(point, point) for point in points]
+        if len(path) == 1:
+            segments.append((path[0], path[0]))
+        for start, end in zip(path, path[1:]):
+            if haversine(start, end, unit=Unit.METERS) > cls.MAX_SEGMENT_M:
+                segments += [(start, start), (end, end)]
+            else:
+                segments.append((start, end))
+        return segments
+
+    @classmethod
+    def find_along(cls, segments, radius=None):
+        """Ids of items within `radius` meters of any ((lat, lon), (lat, lon)) segment."""
+        radius = cls.PICKUP_RADIUS_M if radius is None else radius
+        if not segments:
+            return []
+        cells = cls._get_cells()
+
+        keys = set()
+        for (start_lat, start_lon), (end_lat, end_lon) in segments:
+            keys.update(cls._box_keys(
+                min(start_lat, end_lat), min(start_lon, end_lon), max(start_lat, end_lat), max(start_lon, end_lon),
+                radius
+            ))
+        candidates = [item for key in keys for item in cells.get(key, ())]
+        if not candidates:
+            return []
+
+        ids = np.array([item[0] for item in candidates])
+        segment_array = np.array(segments, dtype=np.float64)
+        origin = float(segment_array[:, :, 0].mean())
+        item_x, item_y = TrackGeometryService.project(
+            [item[1] for item in candidates], [item[2] for item in candidates], origin
+        )
+        start_x, start_y = TrackGeometryService.project(segment_array[:, 0, 0], segment_array[:, 0, 1], origin)
+        end_x, end_y = TrackGeometryService.project(segment_array[:, 1, 0], segment_array[:, 1, 1], origin)
+
+        # Items x segments in chunks, so long batches don't build one huge distance matrix.
+        hit = np.zeros(len(ids), dtype=bool)
+        for chunk in range(0, len(segments), cls.SEGMENT_CHUNK):
+            part = slice(chunk, chunk + cls.SEGMENT_CHUNK)
+            distances = TrackGeometryService.point_segment_distances(
+                item_x[:, None], item_y[:, None],
+                start_x[None, part], start_y[None, part], end_x[None, part], end_y[None, part]
+            )
+            hit |= distances.min(axis=1) < radius
+        return ids[hit].tolist()
+
+    @classmethod
+    def pick_up(cls, athlete_id, points=(), path=()):
+        """Give the athlete every item near the isolated `points` or along the `path` of consecutive fixes."""
+        nearby = set(cls.find_along(cls._segments(points, path)))
+        if not nearby:
+            return []
+
+        through = CollectibleItem.athletes.through
+        owned = set(
+            through.objects
+            .filter(user_id=athlete_id, collectibleitem_id__in=nearby)
+            .values_list('collectibleitem_id', flat=True)
+        )
+        new_ids = sorted(nearby - owned)
+        through.objects.bulk_create(
+            [through(user_id=athlete_id, collectibleitem_id=item_id) for item_id in new_ids],
+            ignore_conflicts=True
+        )
+        return new_ids
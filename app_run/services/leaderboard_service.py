@@ -0,0 +1,115 @@
+from datetime import date, datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Count, DateField, ExpressionWrapper, F, FloatField, Max, Sum
+from django.db.models.functions import Coalesce, Greatest, Trunc
+from django.utils import timezone
+
+from app_run.models import Run, RunRollup
+
+
+class LeaderboardService:
+    PERIODS = [RunRollup.Period.DAY, RunRollup.Period.WEEK, RunRollup.Period.MONTH]
+    METRICS = {
+        'distance': F('distance'),
+        'runs': F('runs_count'),
+        'speed': ExpressionWrapper(F('speed_sum') / F('runs_count'), output_field=FloatField()),
+    }
+    DEFAULT_LIMIT = 10
+    MAX_LIMIT = 100
+
+    @staticmethod
+    def finished_at(run):
+        # The last fix is when the run actually ended; runs without positions fall back to creation time.
+        return run.last_position_at or run.created_at
+
+    @staticmethod
+    def period_start(period, moment):
+        day = timezone.localtime(moment).date() if isinstance(moment, datetime) else moment
+        if period == RunRollup.Period.DAY:
+            return day
+        if period == RunRollup.Period.WEEK:
+            return day - timedelta(days=day.weekday())
+        if period == RunRollup.Period.MONTH:
+            return day.replace(day=1)
+        raise ValueError(f"Unknown period '{period}'")
+
+    @classmethod
+    def record_finished_run(cls, run):
+        finished_at = cls.finished_at(run)
+        for period in cls.PERIODS:
+            start = cls.period_start(period, finished_at)
+            RunRollup.objects.get_or_create(athlete_id=run.athlete_id, period=period, period_start=start)
+            RunRollup.objects.filter(athlete_id=run.athlete_id, period=period, period_start=start).update(
+                runs_count=F('runs_count') + 1,
+                distance=F('distance') + (run.distance or 0.0),
+                speed_sum=F('speed_sum') + run.speed,
+                moving_time=F('moving_time') + run.moving_time,
+                best_speed=Greatest(Coalesce(F('best_speed'), run.speed), run.speed),
+            )
+
+    @classmethod
+    def get_leaderboard(cls, period, metric, coach_id=None, on=None, limit=None):
+        if period not in cls.PERIODS:
+            raise ValueError(f"Unknown period '{period}'")
+        if metric not in cls.METRICS:
+            raise ValueError(f"Unknown metric '{metric}'")
+        try:
+            on = date.fromisoformat(on) if on else timezone.localdate()
+            limit = min(int(limit), cls.MAX_LIMIT) if limit else cls.DEFAULT_LIMIT
+            coach_id = int(coach_id) if coach_id else None
+        except (TypeError, ValueError):
+            raise ValueError("date must be YYYY-MM-DD, limit and coach must be integers")
+        if limit < 1:
+            raise ValueError("limit must be positive")
+
+        start = cls.period_start(period, on)
+        rows = RunRollup.objects.filter(period=period, period_start=start, runs_count__gt=0)
+        if coach_id:
+            rows = rows.filter(athlete__subscriptions__coach_id=coach_id)
+        rows = (
+            rows
+            .annotate(value=cls.METRICS[metric])
+            .order_by('-value', 'athlete_id')
+            .values('athlete_id', 'athlete__username', 'value')[:limit]
+        )
+
+        return {
+            'period': period,
+            'period_start': start,
+            'metric': metric,
+            'results': [
+                {'rank': rank, 'athlete': row['athlete_id'], 'username': row['athlete__username'], 'value': row['value']}
+                for rank, row in enumerate(rows, start=1)
+            ],
+        }
+
+    @classmethod
+    def rebuild(cls):
+        finished_at = Coalesce('last_position_at', 'created_at')
+        rollups = []
+        for period in cls.PERIODS:
+            rows = (
+                Run.objects
+                .filter(status=Run.Status.FINISHED)
+                .annotate(start=Trunc(finished_at, period, output_field=DateField()))
+                .values('athlete_id', 'start')
+                .annotate(
+                    runs=Count('id'),
+                    total=Coalesce(Sum('distance'), 0.0),
+                    speeds=Coalesce(Sum('speed'), 0.0),
+                    moving=Coalesce(Sum('moving_time'), 0.0),
+                    best=Max('speed'),
+                )
+            )
+            rollups.extend(
+                RunRollup(athlete_id=row['athlete_id'], period=period, period_start=row['start'],
+                          runs_count=row['runs'], distance=row['total'], speed_sum=row['speeds'],
+                          moving_time=row['moving'], best_speed=row['best'])
+                for row in rows
+            )
+
+        with transaction.atomic():
+            RunRollup.objects.filter(period__in=cls.PERIODS).delete()
+            RunRollup.objects.bulk_create(rollups, batch_size=1000)
+        return len(rollups)
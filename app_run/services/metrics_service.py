@@ -0,0 +1,91 @@
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+
+class MetricsService:
+    """Per-process request metrics, rendered in the Prometheus text exposition format."""
+    LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+    SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+    _lock = threading.Lock()
+    _requests = defaultdict(int)
+    _latency = {}
+    _queries = {}
+    _sql_seconds = defaultdict(float)
+    _response_size = {}
+
+    @classmethod
+    def record(cls, route, method, status_code, duration, response_size, queries=None, sql_seconds=None):
+        key = (route, method)
+        with cls._lock:
+            cls._requests[(route, method, str(status_code))] += 1
+            cls._latency.setdefault(key, Histogram(cls.LATENCY_BUCKETS)).observe(duration)
+            cls._response_size.setdefault(key, Histogram(cls.SIZE_BUCKETS)).observe(response_size)
+            if queries is not None:
+                cls._queries.setdefault(key, Histogram(cls.QUERY_BUCKETS)).observe(queries)
+                cls._sql_seconds[key] += sql_seconds
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._requests.clear()
+            cls._latency.clear()
+            cls._queries.clear()
+            cls._sql_seconds.clear()
+            cls._response_size.clear()
+
+    @staticmethod
+    def _escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    @classmethod
+    def _labels(cls, **labels):
+        return '{' + ','.join(f'{name}="{cls._escape(value)}"' for name, value in labels.items()) + '}'
+
+    @classmethod
+    def _render_histogram(cls, lines, name, help_text, histograms):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for (route, method), histogram in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{cls._labels(route=route, method=method, le=bound)} {cumulative}')
+            lines.append(f'{name}_sum{cls._labels(route=route, method=method)} {histogram.total}')
+            lines.append(f'{name}_count{cls._labels(route=route, method=method)} {cumulative}')
+
+    @classmethod
+    def render(cls):
+        with cls._lock:
+            lines = [
+                '# HELP http_requests_total Sampled requests by route, method and status.',
+                '# TYPE http_requests_total counter',
+            ]
+            for (route, method, status_code), count in sorted(cls._requests.items()):
+                lines.append(f'http_requests_total{cls._labels(route=route, method=method, status=status_code)} {count}')
+
+            cls._render_histogram(lines, 'http_request_duration_seconds',
+                                  'Request latency; streaming responses until their body is sent.', cls._latency)
+            cls._render_histogram(lines, 'http_request_db_queries',
+                                  'SQL queries issued per request.', cls._queries)
+            cls._render_histogram(lines, 'http_response_size_bytes',
+                                  'Response body size.', cls._response_size)
+
+            lines.append('# HELP http_request_db_seconds_total Time spent executing SQL.')
+            lines.append('# TYPE http_request_db_seconds_total counter')
+            for (route, method), seconds in sorted(cls._sql_seconds.items()):
+                lines.append(f'http_request_db_seconds_total{cls._labels(route=route, method=method)} {seconds}')
+        return '\n'.join(lines) + '\n'
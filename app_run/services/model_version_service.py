@@ -0,0 +1,93 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from app_run.models import ModelVersion
+
+
+class ModelVersionService:
+    """
+    Named change counters for conditional GETs.
+
+    Writers bump a name ('collectible_item', 'challenge', 'user', ...) and
+    conditional() turns the current versions into an ETag / Last-Modified pair,
+    so a matching request is answered with 304 after one lookup in this table.
+    Single rows are not versioned here; their state is read from the row itself.
+    """
+
+    @staticmethod
+    def bump(*names):
+        now = timezone.now()
+        for name in names:
+            updated = ModelVersion.objects.filter(name=name).update(version=F('version') + 1, updated_at=now)
+            if not updated:
+                version, created = ModelVersion.objects.get_or_create(name=name, defaults={'version': 1})
+                if not created:
+                    ModelVersion.objects.filter(name=name).update(version=F('version') + 1, updated_at=now)
+
+    @staticmethod
+    def get_versions(names):
+        """{name: (version, updated_at)}; names that were never bumped are at version 0."""
+        rows = {
+            name: (version, updated_at)
+            for name, version, updated_at in ModelVersion.objects.filter(name__in=names)
+            .values_list('name', 'version', 'updated_at')
+        }
+        return {name: rows.get(name, (0, None)) for name in names}
+
+    @classmethod
+    def conditional(cls, names_func, salt='', state_func=None):
+        """
+        View decorator: answer GET/HEAD with 304 while the versions named by
+        names_func(request, *args, **kwargs) (and `salt`, for data that lives in
+        settings) are unchanged, and mark responses as revalidate-every-time for
+        browsers and briefly cacheable for a CDN.
+
+        state_func(request, *args, **kwargs), if given, returns the values of a
+        row the response is built from; they become part of the ETag, and no
+        Last-Modified is sent since the row has no change time.
+        """
+        def versions(request, *args, **kwargs):
+            if not hasattr(request, '_model_versions'):
+                request._model_versions = cls.get_versions(names_func(request, *args, **kwargs))
+            return request._model_versions
+
+        def etag(request, *args, **kwargs):
+            tokens = [f'{name}:{version}' for name, (version, _) in sorted(versions(request, *args, **kwargs).items())]
+            if state_func is not None:
+                tokens.append(repr(state_func(request, *args, **kwargs)))
+            # The browsable API and JSON are different representations of the same version.
+            tokens += [salt, request.META.get('HTTP_ACCEPT', '')]
+            return hashlib.md5('|'.join(tokens).encode()).hexdigest()
+
+        def last_modified(request, *args, **kwargs):
+            if state_func is not None:
+                return None
+            timestamps = [updated_at for _, updated_at in versions(request, *args, **kwargs).values()]
+            return None if None in timestamps else max(timestamps, default=None)
+
+        def decorator(view):
+            conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+            @wraps(view)
+            def wrapper(request, *args, **kwargs):
+                response = conditional_view(request, *args, **kwargs)
+                cls.patch_headers(response)
+                return response
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def patch_headers(response):
+        if response.status_code not in (200, 304):
+            return
+        patch_cache_control(
+            response, public=True, max_age=0, must_revalidate=True,
+            s_maxage=getattr(settings, 'CDN_CACHE_MAX_AGE', 0)
+        )
+        patch_vary_headers(response, ['Accept'])
@@ -1,24 +1,105 @@
-from app_run.models import Position, CollectibleItem
-from haversine import haversine, Unit
+from django.db import transaction
+from django.db.models import F
+
+from app_run.models import Position, Run
+from app_run.services.collectible_index_service import CollectibleIndexService
+from app_run.services.run_service import RunService
+from app_run.services.task_service import TaskService
+from app_run.services.track_geometry_service import TrackGeometryService
+
+import numpy as np
 
 
 class PositionService:
+    @classmethod
+    def update_collectibles_and_stats(cls, position, defer_pick_up=False):
+        with transaction.atomic():
+            path, late = cls._chain_stats(position.run_id, [position])
+            position.save(update_fields=['distance', 'speed'])
+
+        cls._pick_up(position.run, late, path, defer_pick_up)
+
+    @classmethod
+    def create_batch(cls, run, points, pick_up=True, defer_pick_up=False):
+        """Save a batch of fixes; pickups run inline, in a queued task (defer_pick_up) or not at all."""
+        positions = sorted(
+            (Position(run=run, **point) for point in points),
+            key=lambda position: position.date_time
+        )
+
+        with transaction.atomic():
+            path, late = cls._chain_stats(run.id, positions)
+            Position.objects.bulk_create(positions)
+
+        if pick_up or defer_pick_up:
+            cls._pick_up(run, late, path, defer_pick_up)
+        return positions
+
     @staticmethod
-    def update_collectibles_and_stats(position):
-        athlete = position.run.athlete
-        items = CollectibleItem.objects.all()
-        for i in items:
-            distance = haversine((position.latitude, position.longitude), (i.latitude, i.longitude), unit=Unit.METERS)
-            if distance < 100:
-                athlete.collectible_items.add(i)
-
-        positions_of_run = Position.objects.filter(run=position.run).order_by('date_time')
-        if positions_of_run.count() > 1:
-            last_position = positions_of_run.last()
-            prev_position = positions_of_run[positions_of_run.count() - 2]
-            distance_between = haversine((prev_position.latitude, prev_position.longitude),
-                                         (last_position.latitude, last_position.longitude), unit=Unit.METERS)
-            last_position.distance = round(prev_position.distance + distance_between, 2)
-            time_diff = (last_position.date_time - prev_position.date_time).total_seconds()
-            last_position.speed = round(distance_between / time_diff, 2)
-            last_position.save()
\ No newline at end of file
+    def _pick_up(run, late, path, defer):
+        if not defer:
+            CollectibleIndexService.pick_up(run.athlete_id, points=late, path=path)
+            return
+        TaskService.enqueue('positions.pick_up', {
+            'athlete_id': run.athlete_id,
+            'points': [[str(latitude), str(longitude)] for latitude, longitude in late],
+            'path': [[str(latitude), str(longitude)] for latitude, longitude in path],
+        }, ordering_key=RunService.task_key(run.id))
+
+    @staticmethod
+    def _chain_stats(run_id, positions):
+        """
+        Fill distance/speed of new positions (sorted by date_time) from the run's
+        last known fix and add them to the run's running totals.
+
+        Returns the (lat, lon) path walked since the previous fix, starting at
+        that fix, and the late fixes that are not part of it.
+        """
+        run = Run.objects.select_for_update().only('status', *Run.AGGREGATE_FIELDS).get(id=run_id)
+        # Checked under the row lock, so a concurrent stop can't finalize the totals halfway through.
+        if run.status != Run.Status.IN_PROGRESS:
+            raise RuntimeError(f"The run status isn't '{Run.Status.IN_PROGRESS}'")
+        first_position_at = run.first_position_at
+        if positions and (first_position_at is None or positions[0].date_time < first_position_at):
+            first_position_at = positions[0].date_time
+
+        # Late fixes from before the current end of the track are counted, but not chained.
+        late = 0
+        if run.last_position_at is not None:
+            while late < len(positions) and positions[late].date_time < run.last_position_at:
+                late += 1
+        chained = positions[late:]
+
+        track_distance = run.track_distance
+        moving_time = 0.0
+        last = (run.last_latitude, run.last_longitude, run.last_position_at)
+        path = [(p.latitude, p.longitude) for p in chained]
+        if chained and last[2] is not None:
+            path.insert(0, last[:2])
+        if chained:
+            rows = [(p.latitude, p.longitude, p.date_time) for p in chained]
+            if last[2] is not None:
+                rows.insert(0, last)
+            metrics = TrackGeometryService.measure(*TrackGeometryService.to_arrays(rows))
+            offset = len(rows) - len(chained)
+            distances = np.round(track_distance + metrics.cumulative_distance, 2)
+            speeds = np.round(metrics.segment_speeds, 2)
+            for index, position in enumerate(chained, start=offset):
+                if index:
+                    position.distance = float(distances[index])
+                    position.speed = float(speeds[index - 1])
+            track_distance += float(metrics.cumulative_distance[-1])
+            moving_time = TrackGeometryService.moving_time(metrics)
+            last = rows[-1]
+
+        Run.objects.filter(id=run_id).update(
+            track_distance=track_distance,
+            first_position_at=first_position_at,
+            last_latitude=last[0],
+            last_longitude=last[1],
+            last_position_at=last[2],
+            speed_sum=F('speed_sum') + sum(p.speed for p in positions),
+            positions_count=F('positions_count') + len(positions),
+            moving_time=F('moving_time') + moving_time,
+        )
+        return path, [(p.latitude, p.longitude) for p in positions[:late]]
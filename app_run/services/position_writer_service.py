@@ -0,0 +1,144 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from app_run.models import Run
+from app_run.services.position_service import PositionService
+
+logger = logging.getLogger(__name__)
+
+
+class PositionWriterService:
+    """
+    In-process batching writer for positions accepted by the async ingestion endpoint.
+
+    Request handlers only put validated points on a bounded queue; a single writer
+    thread drains it and writes everything it collected within FLUSH_INTERVAL
+    seconds (or FLUSH_SIZE points) in one transaction, one savepoint per run.
+    Points accepted for a run are counted until written, so stopping the run can
+    wait for them (wait_for_run) instead of finalizing without them. The queue is
+    per process: see POSITION_WRITER_WAIT_TIMEOUT in settings for the deployment
+    this requires.
+    """
+    MAX_QUEUE_SIZE = 10_000
+    FLUSH_SIZE = 2_000
+    FLUSH_INTERVAL = 0.2
+
+    _queue = queue.Queue(maxsize=MAX_QUEUE_SIZE)
+    _thread = None
+    _lock = threading.Lock()
+    # Accepted but not yet written points per run.
+    _pending = Counter()
+    _written = threading.Condition()
+
+    @classmethod
+    def enqueue(cls, run_id, points):
+        cls._ensure_started()
+        with cls._written:
+            cls._pending[run_id] += len(points)
+        try:
+            cls._queue.put_nowait((run_id, points))
+        except queue.Full:
+            cls._done(run_id, len(points))
+            return False
+        return True
+
+    @classmethod
+    def wait_for_run(cls, run_id, timeout=None):
+        """Write or wait out every point accepted for the run so far; False if some are still pending."""
+        if not cls._pending[run_id]:
+            return True
+        if timeout is None:
+            timeout = getattr(settings, 'POSITION_WRITER_WAIT_TIMEOUT', 5.0)
+        # Whatever is still queued is written here; a batch the writer thread already holds is waited for.
+        cls.flush()
+        with cls._written:
+            return cls._written.wait_for(lambda: not cls._pending[run_id], timeout)
+
+    @classmethod
+    def _done(cls, run_id, count):
+        with cls._written:
+            cls._pending[run_id] -= count
+            if cls._pending[run_id] <= 0:
+                del cls._pending[run_id]
+            cls._written.notify_all()
+
+    @classmethod
+    def _ensure_started(cls):
+        if cls._thread is not None and cls._thread.is_alive():
+            return
+        with cls._lock:
+            if cls._thread is None or not cls._thread.is_alive():
+                cls._thread = threading.Thread(target=cls._run, name='position-writer', daemon=True)
+                cls._thread.start()
+
+    @classmethod
+    def _collect(cls, block=True):
+        batches = defaultdict(list)
+        collected = 0
+        if block:
+            # Sleep until there is work, then keep collecting for up to FLUSH_INTERVAL.
+            run_id, points = cls._queue.get()
+            batches[run_id].extend(points)
+            collected += len(points)
+        deadline = time.monotonic() + cls.FLUSH_INTERVAL
+        while collected < cls.FLUSH_SIZE:
+            try:
+                if block:
+                    run_id, points = cls._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                else:
+                    run_id, points = cls._queue.get_nowait()
+            except queue.Empty:
+                break
+            batches[run_id].extend(points)
+            collected += len(points)
+        return batches
+
+    @classmethod
+    def _run(cls):
+        while True:
+            batches = cls._collect()
+            if batches:
+                close_old_connections()
+                try:
+                    cls._write(batches)
+                finally:
+                    close_old_connections()
+
+    @classmethod
+    def flush(cls):
+        """Write everything that is queued right now in the calling thread."""
+        while batches := cls._collect(block=False):
+            cls._write(batches)
+
+    @classmethod
+    def _write(cls, batches):
+        try:
+            runs = Run.objects.in_bulk(list(batches))
+            with transaction.atomic():
+                for run_id, points in batches.items():
+                    run = runs.get(run_id)
+                    if run is None:
+                        logger.warning('Dropped %s positions for run %s: run does not exist', len(points), run_id)
+                        continue
+                    try:
+                        # The run status is checked under its row lock.
+                        with transaction.atomic():
+                            PositionService.create_batch(run, points)
+                    except RuntimeError:
+                        logger.warning('Dropped %s positions for run %s: run is not in progress', len(points), run_id)
+                    except Exception:
+                        logger.exception('Failed to write %s positions for run %s', len(points), run_id)
+        except Exception:
+            logger.exception('Failed to flush %s runs of positions', len(batches))
+        finally:
+            for run_id, points in batches.items():
+                cls._done(run_id, len(points))
+
+atexit.register(PositionWriterService.flush)
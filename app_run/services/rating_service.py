@@ -3,6 +3,7 @@ from django.shortcuts import get_object_or_404
 
 from app_run.models import Subscribe
 from app_run.serializers import SubscribeSerializer
+from app_run.services.user_stats_service import UserStatsService
 
 
 class RatingService:
@@ -27,6 +28,7 @@ class RatingService:
         if serializer.is_valid():
             subscribe.rating = rating
             subscribe.save()
+            UserStatsService.refresh_rating(coach_id)
             return {'success': 'Rating has been saved'}
         else:
             return {'error': serializer.errors['rating'][0], 'status': 400}
\ No newline at end of file
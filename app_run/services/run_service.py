@@ -1,10 +1,18 @@
+from datetime import datetime, timedelta
+
 from rest_framework.response import Response
 
-from app_run.models import Run, Challenge
-from django.db.models import Q, Count, Sum, Min, Max, Avg
+from app_run.models import Run
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.models import User
-from haversine import haversine
+
+from app_run.services.challenge_rule_service import ChallengeRuleService
+from app_run.services.leaderboard_service import LeaderboardService
+from app_run.services.run_track_service import RunTrackService
+from app_run.services.task_service import TaskService
+from app_run.services.track_geometry_service import TrackGeometryService
+from app_run.services.user_stats_service import UserStatsService
 
 
 class RunService:
@@ -19,78 +27,107 @@ class RunService:
             raise ValueError("Invalid action")
 
         expected_status, new_status = cls.allowed_transitions[action]
-        run = get_object_or_404(Run, id=id)
 
-        if run.status != expected_status:
-            raise RuntimeError(f"The run status isn't '{expected_status}'")
+        if action == 'stop':
+            # Imported here: the writer depends on PositionService, which depends on this module.
+            from app_run.services.position_writer_service import PositionWriterService
 
-        run.status = new_status
+            # Positions accepted by the async endpoint must be counted before the totals are finalized.
+            if not PositionWriterService.wait_for_run(id):
+                raise RuntimeError("Positions of the run are still being written, retry the stop")
+
+        with transaction.atomic():
+            run = get_object_or_404(Run.objects.select_for_update(), id=id)
+
+            if run.status != expected_status:
+                raise RuntimeError(f"The run status isn't '{expected_status}'")
+
+            run.status = new_status
+
+            if action == 'stop':
+                cls._finalize_totals(run)
 
-        if action == 'stop':
-            run.distance = cls._calculating_distance(run)
-            run.run_time_seconds = cls._calculate_total_distance(run)
-            run.speed = cls._calculate_average_speed(run)
             run.save()
-            cls._check_challenges(run)
 
-        run.save()
+            if action == 'stop':
+                UserStatsService.record_finished_run(run)
+                LeaderboardService.record_finished_run(run)
+                TaskService.enqueue('run.check_challenges', {'run_id': run.id}, ordering_key=cls.task_key(run.id))
+                TaskService.enqueue('run.simplify_track', {'run_id': run.id}, ordering_key=cls.task_key(run.id))
 
         return run
 
     @staticmethod
-    def _check_challenges(run):
-        user = (
-            User.objects
-            .annotate(
-                runs_finished=Count(
-                    'runs',
-                    filter=Q(runs__status=Run.Status.FINISHED)
-                )
-            )
-            .get(id=run.athlete_id)
-        )
-
-        if user.runs_finished == 10:
-            Challenge.objects.create(full_name="Сделай 10 Забегов!", athlete=user)
-
-        total_distance = Run.objects.filter(athlete=user).aggregate(sum=Sum('distance'))
-        if total_distance['sum']:
-            if total_distance['sum'] >= 50:
-                Challenge.objects.create(full_name="Пробеги 50 километров!", athlete=user)
-
-        if run.distance >= 2 and run.run_time_seconds <= 600:
-            Challenge.objects.create(full_name="2 километра за 10 минут!", athlete=user)
+    def task_key(run_id):
+        return f'run:{run_id}'
 
     @staticmethod
-    def _calculating_distance(run):
-        qs = run.position_set.values()
-        distance = 0
-        if len(qs):
-            for point in range(len(qs) - 1):
-                distance += haversine((qs[point]['latitude'], qs[point]['longitude']), (qs[point + 1]['latitude'], qs[point + 1]['longitude']))
-
-        return round(distance, ndigits=3)
+    def _finalize_totals(run):
+        run.distance = round(run.track_distance / 1000, ndigits=3)
+        if run.first_position_at and run.last_position_at:
+            run.run_time_seconds = (run.last_position_at - run.first_position_at).total_seconds()
+        else:
+            run.run_time_seconds = 0
+        if run.positions_count and run.speed_sum:
+            run.speed = round(run.speed_sum / run.positions_count, ndigits=2)
+        else:
+            run.speed = 0
 
     @staticmethod
-    def _calculate_total_distance(run):
-        qs = run.position_set.aggregate(
-            pos_earliest=Min('date_time'),
-            pos_latest=Max('date_time')
-        )
-        if not qs['pos_latest'] and not qs['pos_earliest']:
-            return 0
-
-        seconds = (qs['pos_latest'] - qs['pos_earliest']).total_seconds()
-
-        return seconds
+    def check_challenges(run):
+        ChallengeRuleService.evaluate_run(run)
 
     @staticmethod
-    def _calculate_average_speed(run):
-        average_speed = run.position_set.aggregate(Avg('speed'))
-        if average_speed['speed__avg']:
-            return round(average_speed['speed__avg'], ndigits=2)
-        else:
-            return 0
+    def recalculate_totals(run):
+        rows = [
+            (position.latitude, position.longitude, position.date_time, position.speed)
+            for position in RunTrackService.get_positions(run)
+        ]
+        if not rows:
+            return {
+                'track_distance': 0.0,
+                'first_position_at': None,
+                'last_position_at': None,
+                'last_latitude': None,
+                'last_longitude': None,
+                'speed_sum': 0.0,
+                'positions_count': 0,
+                'moving_time': 0.0,
+            }
+
+        metrics = TrackGeometryService.measure(*TrackGeometryService.to_arrays(rows))
+        return {
+            'track_distance': float(metrics.cumulative_distance[-1]),
+            'first_position_at': rows[0][2],
+            'last_position_at': rows[-1][2],
+            'last_latitude': rows[-1][0],
+            'last_longitude': rows[-1][1],
+            'speed_sum': sum(row[3] for row in rows),
+            'positions_count': len(rows),
+            'moving_time': TrackGeometryService.moving_time(metrics),
+        }
+
+    @classmethod
+    def repair_totals(cls, run, tolerance=0.01):
+        """Recompute running totals from positions; return the names of fields that had drifted."""
+        totals = cls.recalculate_totals(run)
+        drifted = []
+        for field, value in totals.items():
+            current = getattr(run, field)
+            if isinstance(value, float) and current is not None:
+                changed = abs(current - value) > tolerance
+            elif isinstance(value, datetime) and current is not None:
+                # Packed tracks keep timestamps to the millisecond.
+                changed = abs(current - value) >= timedelta(milliseconds=1)
+            else:
+                changed = current != value
+            if changed:
+                drifted.append(field)
+                setattr(run, field, value)
+
+        if drifted and run.status == Run.Status.FINISHED:
+            cls._finalize_totals(run)
+        return drifted
 
 
 def get_user_or_400(user_id):
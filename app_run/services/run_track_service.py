@@ -0,0 +1,148 @@
+import struct
+import zlib
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import numpy as np
+from django.db import connection, transaction
+
+from app_run.models import Position, Run, RunTrack
+
+
+class RunTrackService:
+    """
+    Packs the positions of a finished run into a single RunTrack blob.
+
+    Layout (zlib-compressed, little-endian): a header with the format version,
+    the point count and the first id / lat / lon / time / distance, followed by
+    per-point delta columns: id (int32), lat and lon in 1e-4 degrees (int32),
+    time in milliseconds (int32), distance in centimeters (int32) and speed in
+    cm/s (uint16). Lat/lon, speed and distance are stored without loss at the
+    precision the Position columns hold; time is kept to the millisecond.
+    """
+    FORMAT_VERSION = 1
+    HEADER = struct.Struct('<BIqiiqq')
+    DELTA_COLUMNS = ['id', 'latitude', 'longitude', 'time', 'distance']
+    COORDINATE_SCALE = 10_000
+    EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    # Rough per-row size (heap tuple + index entries) when the database can't tell us.
+    ESTIMATED_POSITION_ROW_BYTES = 120
+
+    @classmethod
+    def encode(cls, positions):
+        count = len(positions)
+        columns = {
+            'id': np.fromiter((p.id for p in positions), dtype=np.int64, count=count),
+            'latitude': np.fromiter((round(p.latitude * cls.COORDINATE_SCALE) for p in positions),
+                                    dtype=np.int64, count=count),
+            'longitude': np.fromiter((round(p.longitude * cls.COORDINATE_SCALE) for p in positions),
+                                     dtype=np.int64, count=count),
+            'time': np.fromiter(((p.date_time - cls.EPOCH) // timedelta(milliseconds=1) for p in positions),
+                                dtype=np.int64, count=count),
+            'distance': np.fromiter((round(p.distance * 100) for p in positions), dtype=np.int64, count=count),
+        }
+        speeds = np.fromiter((round(p.speed * 100) for p in positions), dtype=np.int64, count=count)
+
+        first = [int(columns[name][0]) if count else 0 for name in cls.DELTA_COLUMNS]
+        header = cls.HEADER.pack(cls.FORMAT_VERSION, count, *first)
+        body = b''
+        int32 = np.iinfo(np.int32)
+        for index, name in enumerate(cls.DELTA_COLUMNS):
+            deltas = np.diff(columns[name], prepend=first[index])
+            if count and (deltas.min() < int32.min or deltas.max() > int32.max):
+                raise ValueError(f"Track {name} delta does not fit into int32")
+            body += deltas.astype('<i4').tobytes()
+        body += np.clip(speeds, 0, np.iinfo(np.uint16).max).astype('<u2').tobytes()
+        return zlib.compress(header + body)
+
+    @classmethod
+    def decode(cls, data, run_id=None):
+        raw = zlib.decompress(bytes(data))
+        version, count, *first = cls.HEADER.unpack_from(raw)
+        if version != cls.FORMAT_VERSION:
+            raise ValueError(f"Unsupported track format version: {version}")
+
+        offset = cls.HEADER.size
+        columns = {}
+        for index, name in enumerate(cls.DELTA_COLUMNS):
+            deltas = np.frombuffer(raw, dtype='<i4', count=count, offset=offset)
+            columns[name] = first[index] + np.cumsum(deltas, dtype=np.int64)
+            offset += deltas.nbytes
+        speeds = np.frombuffer(raw, dtype='<u2', count=count, offset=offset)
+
+        return [
+            Position(
+                id=position_id,
+                run_id=run_id,
+                latitude=Decimal(latitude).scaleb(-4),
+                longitude=Decimal(longitude).scaleb(-4),
+                date_time=cls.EPOCH + timedelta(milliseconds=time),
+                speed=speed / 100,
+                distance=distance / 100,
+            )
+            for position_id, latitude, longitude, time, distance, speed in zip(
+                columns['id'].tolist(), columns['latitude'].tolist(), columns['longitude'].tolist(),
+                columns['time'].tolist(), columns['distance'].tolist(), speeds.tolist()
+            )
+        ]
+
+    @classmethod
+    def get_positions(cls, run):
+        """All positions of a run ordered by time, decoded from its packed track if it has one."""
+        track = RunTrack.objects.filter(run_id=run.id).only('data').first()
+        if track is not None:
+            return cls.decode(track.data, run_id=run.id)
+        return list(Position.objects.filter(run_id=run.id).order_by('date_time', 'id'))
+
+    @classmethod
+    def iter_rows(cls, run_id, chunk_size=2000):
+        """Yield (latitude, longitude, date_time, speed, distance) rows of a run ordered by time."""
+        track = RunTrack.objects.filter(run_id=run_id).only('data').first()
+        if track is not None:
+            yield from cls.as_rows(cls.decode(track.data, run_id=run_id))
+            return
+
+        yield from (
+            Position.objects
+            .filter(run_id=run_id)
+            .order_by('date_time', 'id')
+            .values_list('latitude', 'longitude', 'date_time', 'speed', 'distance')
+            .iterator(chunk_size=chunk_size)
+        )
+
+    @staticmethod
+    def as_rows(positions):
+        """Position objects as the rows iter_rows() yields."""
+        for position in positions:
+            yield position.latitude, position.longitude, position.date_time, position.speed, position.distance
+
+    @classmethod
+    def _rows_size(cls, run):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT COALESCE(SUM(pg_column_size(p.*)), 0) FROM {Position._meta.db_table} p '
+                    'WHERE p.run_id = %s',
+                    [run.id]
+                )
+                return cursor.fetchone()[0]
+        return Position.objects.filter(run_id=run.id).count() * cls.ESTIMATED_POSITION_ROW_BYTES
+
+    @classmethod
+    def compact(cls, run):
+        """Replace the Position rows of a finished run with a packed track. Returns (points, rows bytes, blob bytes)."""
+        if run.status != Run.Status.FINISHED:
+            raise RuntimeError("Only finished runs can be compacted")
+
+        with transaction.atomic():
+            list(Run.objects.select_for_update().filter(id=run.id).values_list('id'))
+            if RunTrack.objects.filter(run_id=run.id).exists():
+                return 0, 0, 0
+
+            positions = list(Position.objects.filter(run_id=run.id).order_by('date_time', 'id'))
+            rows_size = cls._rows_size(run)
+            data = cls.encode(positions)
+            RunTrack.objects.create(run=run, points_count=len(positions), data=data)
+            Position.objects.filter(run_id=run.id).delete()
+
+        return len(positions), rows_size, len(data)
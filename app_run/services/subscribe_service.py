@@ -3,6 +3,7 @@ from django.contrib.auth.models import User
 
 from app_run.services.run_service import get_user_or_400
 from app_run.models import Subscribe
+from app_run.services.user_stats_service import UserStatsService
 
 
 class SubscribeService:
@@ -26,4 +27,5 @@ class SubscribeService:
             raise ValueError("Invalid rating")
         subscribe.rating = rating
         subscribe.save()
+        UserStatsService.refresh_rating(coach_id)
         return subscribe
\ No newline at end of file
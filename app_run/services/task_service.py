@@ -0,0 +1,114 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from app_run.models import Task
+
+logger = logging.getLogger(__name__)
+
+
+class TaskService:
+    """
+    Small DB-backed task queue for side effects that don't belong on the request path.
+
+    Handlers are registered by name with @TaskService.handler('name') (see app_run/tasks.py)
+    and run inside a transaction together with marking the task done, so a retried
+    task never sees half of its previous attempt.
+    """
+    handlers = {}
+    CLAIM_WINDOW = 100
+    RETRY_BASE_DELAY = 2
+
+    @classmethod
+    def handler(cls, name):
+        def register(func):
+            cls.handlers[name] = func
+            return func
+        return register
+
+    @classmethod
+    def enqueue(cls, name, payload=None, ordering_key='', max_attempts=3):
+        if name not in cls.handlers:
+            raise ValueError(f"Unknown task: {name}")
+        task = Task.objects.create(
+            name=name, payload=payload or {}, ordering_key=ordering_key, max_attempts=max_attempts
+        )
+        if getattr(settings, 'TASKS_ALWAYS_EAGER', False):
+            transaction.on_commit(lambda: cls._claim_and_execute(task.id))
+        return task
+
+    @classmethod
+    def claim(cls, limit, busy_keys=()):
+        """Mark up to `limit` due tasks as running, at most one per ordering key, respecting key order."""
+        candidates = list(
+            Task.objects
+            .filter(status=Task.Status.PENDING, run_after__lte=timezone.now())
+            .exclude(ordering_key__in=[key for key in busy_keys if key])
+            .order_by('id')[:cls.CLAIM_WINDOW]
+        )
+        keys = {task.ordering_key for task in candidates if task.ordering_key}
+        first_unfinished = dict(
+            Task.objects
+            .filter(ordering_key__in=keys, status__in=[Task.Status.PENDING, Task.Status.RUNNING])
+            .values('ordering_key')
+            .annotate(first_id=Min('id'))
+            .values_list('ordering_key', 'first_id')
+        )
+
+        claimed, claimed_keys = [], set()
+        for task in candidates:
+            if len(claimed) >= limit:
+                break
+            if task.ordering_key:
+                if task.ordering_key in claimed_keys or first_unfinished.get(task.ordering_key) != task.id:
+                    continue
+            updated = Task.objects.filter(id=task.id, status=Task.Status.PENDING).update(
+                status=Task.Status.RUNNING, updated_at=timezone.now()
+            )
+            if updated:
+                task.status = Task.Status.RUNNING
+                claimed.append(task)
+                claimed_keys.add(task.ordering_key)
+        return claimed
+
+    @classmethod
+    def execute(cls, task):
+        handler = cls.handlers.get(task.name)
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for task '{task.name}'")
+            with transaction.atomic():
+                handler(**task.payload)
+                Task.objects.filter(id=task.id).update(
+                    status=Task.Status.DONE, attempts=task.attempts + 1, updated_at=timezone.now()
+                )
+            return True
+        except Exception:
+            logger.exception('Task %s (%s) failed', task.id, task.name)
+            attempts = task.attempts + 1
+            failed = attempts >= task.max_attempts
+            Task.objects.filter(id=task.id).update(
+                status=Task.Status.FAILED if failed else Task.Status.PENDING,
+                attempts=attempts,
+                run_after=timezone.now() + timedelta(seconds=cls.RETRY_BASE_DELAY ** attempts),
+                last_error=traceback.format_exc(),
+                updated_at=timezone.now(),
+            )
+            return False
+
+    @classmethod
+    def _claim_and_execute(cls, task_id):
+        if Task.objects.filter(id=task_id, status=Task.Status.PENDING).update(status=Task.Status.RUNNING):
+            cls.execute(Task.objects.get(id=task_id))
+
+    @staticmethod
+    def requeue_stale(older_than):
+        return Task.objects.filter(
+            status=Task.Status.RUNNING,
+            updated_at__lt=timezone.now() - older_than
+        ).update(status=Task.Status.PENDING, updated_at=timezone.now())
@@ -0,0 +1,77 @@
+import json
+from itertools import islice
+from xml.sax.saxutils import escape
+
+from app_run.services.run_track_service import RunTrackService
+
+
+class TrackExportService:
+    CHUNK_SIZE = 500
+    CONTENT_TYPES = {
+        'polyline': 'text/plain; charset=utf-8',
+        'gpx': 'application/gpx+xml',
+        'ndjson': 'application/x-ndjson',
+    }
+
+    @classmethod
+    def stream(cls, run_id, fmt, rows=None):
+        rows = RunTrackService.iter_rows(run_id) if rows is None else rows
+        writer = getattr(cls, f'_write_{fmt}')
+        return writer(run_id, rows)
+
+    @classmethod
+    def _chunks(cls, rows):
+        rows = iter(rows)
+        while chunk := list(islice(rows, cls.CHUNK_SIZE)):
+            yield chunk
+
+    @staticmethod
+    def _encode_polyline_value(value):
+        value = ~(value << 1) if value < 0 else value << 1
+        encoded = []
+        while value >= 0x20:
+            encoded.append(chr((0x20 | (value & 0x1f)) + 63))
+            value >>= 5
+        encoded.append(chr(value + 63))
+        return ''.join(encoded)
+
+    @classmethod
+    def _write_polyline(cls, run_id, rows):
+        # Google encoded polyline algorithm, precision 5.
+        prev_lat = prev_lon = 0
+        for chunk in cls._chunks(rows):
+            parts = []
+            for latitude, longitude, *_ in chunk:
+                lat, lon = round(latitude * 100_000), round(longitude * 100_000)
+                parts.append(cls._encode_polyline_value(lat - prev_lat))
+                parts.append(cls._encode_polyline_value(lon - prev_lon))
+                prev_lat, prev_lon = lat, lon
+            yield ''.join(parts)
+
+    @classmethod
+    def _write_gpx(cls, run_id, rows):
+        yield (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<gpx version="1.1" creator="project_run" xmlns="http://www.topografix.com/GPX/1/1">\n'
+            f'<trk><name>{escape(f"Run {run_id}")}</name><trkseg>\n'
+        )
+        for chunk in cls._chunks(rows):
+            yield ''.join(
+                f'<trkpt lat="{latitude}" lon="{longitude}"><time>{date_time.isoformat()}</time></trkpt>\n'
+                for latitude, longitude, date_time, *_ in chunk
+            )
+        yield '</trkseg></trk>\n</gpx>\n'
+
+    @classmethod
+    def _write_ndjson(cls, run_id, rows):
+        for chunk in cls._chunks(rows):
+            yield ''.join(
+                json.dumps({
+                    'latitude': str(latitude),
+                    'longitude': str(longitude),
+                    'date_time': date_time.isoformat(),
+                    'speed': speed,
+                    'distance': distance,
+                }) + '\n'
+                for latitude, longitude, date_time, speed, distance in chunk
+            )
@@ -0,0 +1,74 @@
+from typing import NamedTuple
+
+import numpy as np
+
+
+class TrackMetrics(NamedTuple):
+    segment_distances: np.ndarray
+    cumulative_distance: np.ndarray
+    segment_speeds: np.ndarray
+    elapsed: np.ndarray
+
+
+class TrackGeometryService:
+    # Mean Earth radius, the same value the haversine package uses.
+    EARTH_RADIUS_M = 6_371_008.8
+    # Segments slower than this (standing at a crossing, GPS drift) don't count as moving time.
+    MOVING_SPEED = 0.5
+
+    @staticmethod
+    def to_arrays(rows):
+        """Split (latitude, longitude, date_time) rows into float64 lat/lon arrays and epoch seconds."""
+        rows = list(rows)
+        latitudes = np.fromiter((float(row[0]) for row in rows), dtype=np.float64, count=len(rows))
+        longitudes = np.fromiter((float(row[1]) for row in rows), dtype=np.float64, count=len(rows))
+        timestamps = np.fromiter((row[2].timestamp() for row in rows), dtype=np.float64, count=len(rows))
+        return latitudes, longitudes, timestamps
+
+    @classmethod
+    def pairwise_distances(cls, latitudes, longitudes):
+        lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+        lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+        d_lat = lat[1:] - lat[:-1]
+        d_lon = lon[1:] - lon[:-1]
+        a = np.sin(d_lat / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(d_lon / 2) ** 2
+        return 2 * cls.EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+    @classmethod
+    def measure(cls, latitudes, longitudes, timestamps):
+        segment_distances = cls.pairwise_distances(latitudes, longitudes)
+        cumulative_distance = np.concatenate(([0.0], np.cumsum(segment_distances)))
+
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        elapsed = timestamps - timestamps[0] if len(timestamps) else timestamps
+        time_diffs = np.diff(timestamps)
+        segment_speeds = np.divide(
+            segment_distances, time_diffs,
+            out=np.zeros_like(segment_distances),
+            where=time_diffs > 0
+        )
+        return TrackMetrics(segment_distances, cumulative_distance, segment_speeds, elapsed)
+
+    @classmethod
+    def moving_time(cls, metrics):
+        time_diffs = np.diff(metrics.elapsed)
+        return float(time_diffs[metrics.segment_speeds >= cls.MOVING_SPEED].sum())
+
+    @classmethod
+    def project(cls, latitudes, longitudes, origin_latitude=None):
+        """Equirectangular projection to meters around origin_latitude; accurate enough within a city."""
+        lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+        lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+        origin = np.radians(origin_latitude) if origin_latitude is not None else (lat.mean() if len(lat) else 0.0)
+        return cls.EARTH_RADIUS_M * lon * np.cos(origin), cls.EARTH_RADIUS_M * lat
+
+    @staticmethod
+    def point_segment_distances(px, py, ax, ay, bx, by):
+        """Distances from points (px, py) to segments (a, b) in projected meters; all arguments broadcast."""
+        dx, dy = bx - ax, by - ay
+        length_sq = dx * dx + dy * dy
+        t = np.divide((px - ax) * dx + (py - ay) * dy, length_sq,
+                      out=np.zeros(np.broadcast(px, py, ax, ay, length_sq).shape), where=length_sq > 0)
+        t = np.clip(t, 0.0, 1.0)
+        return np.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
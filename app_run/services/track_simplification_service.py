@@ -0,0 +1,92 @@
+from typing import NamedTuple
+
+import numpy as np
+from django.db import transaction
+
+from app_run.models import Run, RunTrackLevel
+from app_run.services.run_track_service import RunTrackService
+from app_run.services.track_geometry_service import TrackGeometryService
+
+
+class DetailLevel(NamedTuple):
+    # Douglas-Peucker tolerance in meters; doubled until the track fits into max_points.
+    tolerance: float
+    max_points: int
+
+
+class TrackSimplificationService:
+    FULL = 'full'
+    LEVELS = {
+        RunTrackLevel.Detail.LOW: DetailLevel(tolerance=20.0, max_points=300),
+        RunTrackLevel.Detail.MEDIUM: DetailLevel(tolerance=4.0, max_points=2000),
+    }
+    DETAILS = [*LEVELS, FULL]
+
+    @staticmethod
+    def simplify(latitudes, longitudes, tolerance):
+        """Douglas-Peucker; returns a boolean mask of the points to keep (always both ends)."""
+        count = len(latitudes)
+        keep = np.zeros(count, dtype=bool)
+        if count <= 2:
+            keep[:] = True
+            return keep
+
+        x, y = TrackGeometryService.project(latitudes, longitudes)
+        keep[[0, -1]] = True
+        stack = [(0, count - 1)]
+        while stack:
+            start, end = stack.pop()
+            if end - start < 2:
+                continue
+            distances = TrackGeometryService.point_segment_distances(
+                x[start + 1:end], y[start + 1:end], x[start], y[start], x[end], y[end]
+            )
+            farthest = int(distances.argmax())
+            if distances[farthest] > tolerance:
+                split = start + 1 + farthest
+                keep[split] = True
+                stack.append((start, split))
+                stack.append((split, end))
+        return keep
+
+    @classmethod
+    def reduce(cls, positions, detail):
+        """Positions of one detail level and the tolerance that got them under its point budget."""
+        level = cls.LEVELS[detail]
+        latitudes = [float(p.latitude) for p in positions]
+        longitudes = [float(p.longitude) for p in positions]
+        tolerance = level.tolerance
+        keep = cls.simplify(latitudes, longitudes, tolerance)
+        while keep.sum() > level.max_points:
+            tolerance *= 2
+            keep = cls.simplify(latitudes, longitudes, tolerance)
+        return [position for position, kept in zip(positions, keep) if kept], tolerance
+
+    @classmethod
+    def build(cls, run):
+        """Precompute and store every detail level of a finished run. Returns {detail: points}."""
+        if run.status != Run.Status.FINISHED:
+            raise RuntimeError("Only finished runs can be simplified")
+
+        positions = RunTrackService.get_positions(run)
+        levels = {detail: cls.reduce(positions, detail) for detail in cls.LEVELS}
+        with transaction.atomic():
+            for detail, (kept, tolerance) in levels.items():
+                RunTrackLevel.objects.update_or_create(
+                    run=run, detail=detail,
+                    defaults={'tolerance': tolerance, 'points_count': len(kept),
+                              'data': RunTrackService.encode(kept)}
+                )
+        return {detail: len(kept) for detail, (kept, _) in levels.items()}
+
+    @classmethod
+    def get_positions(cls, run, detail):
+        """Positions of a run at the requested detail; levels that aren't stored yet are computed on the fly."""
+        if detail not in cls.DETAILS:
+            raise ValueError(f"Unknown detail '{detail}', expected one of: {', '.join(cls.DETAILS)}")
+        if detail != cls.FULL:
+            level = RunTrackLevel.objects.filter(run_id=run.id, detail=detail).only('data').first()
+            if level is not None:
+                return RunTrackService.decode(level.data, run_id=run.id)
+        positions = RunTrackService.get_positions(run)
+        return positions if detail == cls.FULL else cls.reduce(positions, detail)[0]
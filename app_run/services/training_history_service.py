@@ -0,0 +1,55 @@
+from datetime import date, timedelta
+
+from django.utils import timezone
+
+from app_run.models import RunRollup
+from app_run.services.leaderboard_service import LeaderboardService
+
+
+class TrainingHistoryService:
+    DEFAULT_DAYS = 30
+    MAX_BUCKETS = 400
+
+    @classmethod
+    def get_history(cls, athlete_id, date_from=None, date_to=None, bucket=None):
+        bucket = bucket or RunRollup.Period.DAY
+        if bucket not in RunRollup.Period.values:
+            raise ValueError(f"Unknown bucket '{bucket}', expected one of: {', '.join(RunRollup.Period.values)}")
+        try:
+            date_to = date.fromisoformat(date_to) if date_to else timezone.localdate()
+            date_from = date.fromisoformat(date_from) if date_from else date_to - timedelta(days=cls.DEFAULT_DAYS - 1)
+        except ValueError:
+            raise ValueError("from and to must be YYYY-MM-DD")
+        if date_from > date_to:
+            raise ValueError("from must not be after to")
+
+        start = LeaderboardService.period_start(bucket, date_from)
+        # A day is the smallest bucket, so this bounds every bucket size.
+        if bucket == RunRollup.Period.DAY and (date_to - start).days >= cls.MAX_BUCKETS:
+            raise ValueError(f"At most {cls.MAX_BUCKETS} days can be requested at once")
+
+        # One range scan over the (athlete, period, period_start) unique index.
+        rollups = (
+            RunRollup.objects
+            .filter(athlete_id=athlete_id, period=bucket, period_start__gte=start, period_start__lte=date_to)
+            .order_by('period_start')
+            .values_list('period_start', 'runs_count', 'distance', 'moving_time', 'speed_sum', 'best_speed')
+        )
+
+        return {
+            'athlete': athlete_id,
+            'bucket': bucket,
+            'from': start,
+            'to': date_to,
+            'results': [
+                {
+                    'period_start': period_start,
+                    'runs': runs,
+                    'distance': distance,
+                    'moving_time': moving_time,
+                    'avg_speed': speed_sum / runs if runs else None,
+                    'best_speed': best_speed,
+                }
+                for period_start, runs, distance, moving_time, speed_sum, best_speed in rollups
+            ],
+        }
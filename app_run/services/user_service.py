@@ -1,6 +1,6 @@
 from django.contrib.auth.models import User
-from django.db.models import Count, Q, Avg
-from app_run.models import Run
+from django.db.models import F, prefetch_related_objects
+from django.db.models.functions import Coalesce
 from app_run.serializers import UserSerializer, UserForCoachSerializer, UserForAthleteSerializer
 
 
@@ -9,11 +9,8 @@ class UserService:
     def get_filtered_users(user_type=None):
         qs = User.objects.filter(is_superuser=False)
         qs = qs.annotate(
-            runs_finished=Count(
-                'runs',
-                filter=Q(runs__status=Run.Status.FINISHED)
-            ),
-            rating=Avg('subscribers__rating')
+            runs_finished=Coalesce(F('stats__runs_finished'), 0),
+            rating=F('stats__rating')
         )
         if user_type == 'athlete':
             qs = qs.filter(is_staff=False)
@@ -21,6 +18,12 @@ class UserService:
             qs = qs.filter(is_staff=True)
         return qs
 
+    @staticmethod
+    def prefetch_profile(user):
+        relation = 'subscribers' if user.is_staff else 'subscriptions'
+        prefetch_related_objects([user], 'collectible_items', relation)
+        return user
+
     @staticmethod
     def get_serializer_for_user(user, action):
         if action == 'list':
@@ -0,0 +1,85 @@
+from django.db import transaction
+from django.db.models import F, Q, Count, Sum, Max, Min, Avg
+from django.db.models.functions import Coalesce, Greatest, Least
+
+from app_run.models import Run, Subscribe, UserStats
+
+
+class UserStatsService:
+    BEST_TIME_DISTANCE = 2
+
+    @classmethod
+    def record_finished_run(cls, run):
+        distance = run.distance or 0.0
+        updates = {}
+        if distance >= cls.BEST_TIME_DISTANCE:
+            run_time = run.run_time_seconds
+            updates['best_2km_time'] = Least(Coalesce(F('best_2km_time'), run_time), run_time)
+        UserStats.objects.get_or_create(user_id=run.athlete_id)
+        UserStats.objects.filter(user_id=run.athlete_id).update(
+            runs_finished=F('runs_finished') + 1,
+            total_distance=F('total_distance') + distance,
+            max_distance=Greatest(Coalesce(F('max_distance'), distance), distance),
+            speed_sum=F('speed_sum') + run.speed,
+            **updates,
+        )
+
+    @staticmethod
+    def refresh_rating(coach_id):
+        rating = Subscribe.objects.filter(coach_id=coach_id).aggregate(rating=Avg('rating'))['rating']
+        UserStats.objects.update_or_create(user_id=coach_id, defaults={'rating': rating})
+
+    @classmethod
+    def rebuild(cls):
+        rows = (
+            Run.objects
+            .filter(status=Run.Status.FINISHED)
+            .values('athlete_id')
+            .annotate(
+                runs=Count('id'),
+                total=Coalesce(Sum('distance'), 0.0),
+                longest=Max('distance'),
+                speed=Coalesce(Sum('speed'), 0.0),
+                best_time=Min('run_time_seconds', filter=Q(distance__gte=cls.BEST_TIME_DISTANCE)),
+            )
+        )
+        stats = [
+            UserStats(
+                user_id=row['athlete_id'],
+                runs_finished=row['runs'],
+                total_distance=row['total'],
+                max_distance=row['longest'],
+                speed_sum=row['speed'],
+                best_2km_time=row['best_time'],
+            )
+            for row in rows
+        ]
+        ratings = [
+            UserStats(user_id=row['coach_id'], rating=row['avg_rating'])
+            for row in (
+                Subscribe.objects
+                .filter(rating__isnull=False)
+                .values('coach_id')
+                .annotate(avg_rating=Avg('rating'))
+            )
+        ]
+
+        with transaction.atomic():
+            UserStats.objects.update(
+                runs_finished=0, total_distance=0.0, max_distance=None, speed_sum=0.0, rating=None, best_2km_time=None
+            )
+            UserStats.objects.bulk_create(
+                stats,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['user'],
+                update_fields=['runs_finished', 'total_distance', 'max_distance', 'speed_sum', 'best_2km_time'],
+            )
+            UserStats.objects.bulk_create(
+                ratings,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['user'],
+                update_fields=['rating'],
+            )
+        return len(stats), len(ratings)
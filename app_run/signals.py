@@ -0,0 +1,25 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from app_run.models import Challenge, CollectibleItem
+from app_run.services.collectible_index_service import CollectibleIndexService
+from app_run.services.model_version_service import ModelVersionService
+
+
+@receiver([post_save, post_delete], sender=CollectibleItem)
+def invalidate_collectible_index(sender, **kwargs):
+    CollectibleIndexService.invalidate()
+    ModelVersionService.bump('collectible_item')
+
+
+@receiver([post_save, post_delete], sender=Challenge)
+def bump_challenge_version(sender, **kwargs):
+    ModelVersionService.bump('challenge')
+
+
+@receiver([post_save, post_delete], sender=User)
+def bump_user_version(sender, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    ModelVersionService.bump('user')
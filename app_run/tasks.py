@@ -0,0 +1,36 @@
+from app_run.models import Position, Run
+from app_run.services.collectible_index_service import CollectibleIndexService
+from app_run.services.position_service import PositionService
+from app_run.services.run_service import RunService
+from app_run.services.run_track_service import RunTrackService
+from app_run.services.task_service import TaskService
+from app_run.services.track_simplification_service import TrackSimplificationService
+
+
+# No longer enqueued (stats are updated on the request path); kept for tasks queued before that.
+@TaskService.handler('position.process')
+def process_position(position_id):
+    position = Position.objects.select_related('run').filter(id=position_id).first()
+    if position is not None:
+        PositionService.update_collectibles_and_stats(position)
+
+
+@TaskService.handler('positions.pick_up')
+def pick_up_collectibles(athlete_id, points, path=()):
+    CollectibleIndexService.pick_up(athlete_id, points=points, path=path)
+
+
+@TaskService.handler('run.check_challenges')
+def check_challenges(run_id):
+    RunService.check_challenges(Run.objects.get(id=run_id))
+
+
+# No longer enqueued on stop (compaction is opt-in, see compact_run_tracks); kept for tasks queued before that.
+@TaskService.handler('run.compact_track')
+def compact_track(run_id):
+    RunTrackService.compact(Run.objects.get(id=run_id))
+
+
+@TaskService.handler('run.simplify_track')
+def simplify_track(run_id):
+    TrackSimplificationService.build(Run.objects.get(id=run_id))
@@ -1,3 +1,422 @@
-from django.test import TestCase
+import re
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+from unittest import skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from app_run.db_router import replica_alias, request_scope, use_replica
+from app_run.middleware import ReplicaStickinessMiddleware
+from app_run.models import Challenge, CollectibleItem, ModelVersion, Position, Run, RunTrack, Subscribe, Task, UserStats
+from app_run.services.challenge_rule_service import ChallengeRuleService
+from app_run.services.metrics_service import MetricsService
+from app_run.services.position_service import PositionService
+from app_run.services.position_writer_service import PositionWriterService
+from app_run.services.run_track_service import RunTrackService
+from app_run.services.task_service import TaskService
+from app_run.services.user_stats_service import UserStatsService
+
+
+class UserRetrieveQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.coach = User.objects.create(username='coach', is_staff=True)
+        cls.athletes = User.objects.bulk_create([User(username=f'athlete{i}') for i in range(50)])
+        Subscribe.objects.bulk_create([Subscribe(athlete=athlete, coach=cls.coach) for athlete in cls.athletes])
+        items = CollectibleItem.objects.bulk_create([
+            CollectibleItem(name=f'item{i}', uid=f'uid{i}', latitude=55, longitude=37,
+                            picture='https://example.com/item.png', value=i)
+            for i in range(50)
+        ])
+        cls.coach.collectible_items.add(*items)
+        cls.athletes[0].collectible_items.add(*items)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_coach_profile_queries_do_not_grow_with_roster(self):
+        # user, collectible items, subscribers
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/users/{self.coach.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['athletes']), 50)
+        self.assertEqual(len(response.data['items']), 50)
+
+    def test_athlete_profile_queries_do_not_grow_with_items(self):
+        # user, collectible items, subscriptions
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/users/{self.athletes[0].id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['coach'], self.coach.id)
+        self.assertEqual(len(response.data['items']), 50)
+
+
+class QueryPlanTest(TestCase):
+    """EXPLAIN the hot queries and fail when one of them falls back to a full scan or a sort."""
+    BAD_PLAN_MARKERS = {
+        'sqlite': [r'\bSCAN\b', r'USE TEMP B-TREE'],
+        'postgresql': [r'Seq Scan', r'\bSort\b'],
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        coaches = User.objects.bulk_create([User(username=f'coach{i}', is_staff=True) for i in range(3)])
+        athletes = User.objects.bulk_create([User(username=f'athlete{i}') for i in range(30)])
+        Subscribe.objects.bulk_create([
+            Subscribe(athlete=athlete, coach=coaches[i % len(coaches)], rating=i % 5 + 1)
+            for i, athlete in enumerate(athletes)
+        ])
+        UserStats.objects.bulk_create([UserStats(user=athlete, runs_finished=1) for athlete in athletes])
+        runs = Run.objects.bulk_create([
+            Run(athlete=athlete, comment='seed', status=status)
+            for athlete in athletes
+            for status in (Run.Status.FINISHED, Run.Status.FINISHED, Run.Status.IN_PROGRESS)
+        ])
+        start = timezone.now()
+        Position.objects.bulk_create([
+            Position(run=run, latitude=55, longitude=37, date_time=start + timedelta(seconds=i))
+            for run in runs[:10]
+            for i in range(20)
+        ])
+        cls.coach, cls.athlete, cls.seed_run = coaches[0], athletes[0], runs[0]
+
+    def assertIndexedPlan(self, queryset):
+        if connection.vendor not in self.BAD_PLAN_MARKERS:
+            self.skipTest(f'No plan markers for {connection.vendor}')
+        if connection.vendor == 'postgresql':
+            # The seeded tables are tiny; make the planner show whether an index can serve the query at all.
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain()
+        for marker in self.BAD_PLAN_MARKERS[connection.vendor]:
+            self.assertIsNone(re.search(marker, plan), f'{queryset.query}\n{plan}')
+
+    def test_run_positions_in_time_order(self):
+        self.assertIndexedPlan(Position.objects.filter(run_id=self.seed_run.id).order_by('date_time', 'id'))
+
+    def test_athlete_runs_by_status(self):
+        self.assertIndexedPlan(
+            Run.objects.filter(athlete_id=self.athlete.id, status=Run.Status.FINISHED).order_by('created_at', 'id')
+        )
+
+    def test_subscription_by_coach_and_athlete(self):
+        self.assertIndexedPlan(Subscribe.objects.filter(coach_id=self.coach.id, athlete_id=self.athlete.id))
+
+    def test_coach_ratings(self):
+        self.assertIndexedPlan(Subscribe.objects.filter(coach_id=self.coach.id).values('rating'))
+
+    def test_coach_analytics(self):
+        self.assertIndexedPlan(
+            UserStats.objects.filter(user__subscriptions__coach_id=self.coach.id, runs_finished__gt=0)
+        )
+
+    def test_run_tasks_in_order(self):
+        self.assertIndexedPlan(
+            Task.objects.filter(ordering_key=f'run:{self.seed_run.id}', status=Task.Status.PENDING).order_by('id')
+        )
+
+
+class RunTrackServiceTest(TestCase):
+    @staticmethod
+    def as_tuples(positions):
+        return [(p.id, p.latitude, p.longitude, p.date_time, p.speed, p.distance) for p in positions]
+
+    def test_round_trip(self):
+        start = datetime(2024, 3, 1, 6, 30, 15, 123000, tzinfo=dt_timezone.utc)
+        positions = [
+            Position(id=10, latitude=Decimal('-33.9249'), longitude=Decimal('18.4241'),
+                     date_time=start, speed=0.0, distance=0.0),
+            Position(id=11, latitude=Decimal('-33.9250'), longitude=Decimal('-0.0001'),
+                     date_time=start + timedelta(milliseconds=1999), speed=3.57, distance=11.12),
+            Position(id=250, latitude=Decimal('89.9999'), longitude=Decimal('-179.9999'),
+                     date_time=start + timedelta(hours=3, milliseconds=1), speed=655.35, distance=42195.01),
+        ]
+
+        decoded = RunTrackService.decode(RunTrackService.encode(positions), run_id=7)
+
+        self.assertEqual(self.as_tuples(decoded), self.as_tuples(positions))
+        self.assertTrue(all(p.run_id == 7 for p in decoded))
+
+    def test_empty_track(self):
+        self.assertEqual(RunTrackService.decode(RunTrackService.encode([])), [])
+
+    def test_delta_overflow(self):
+        moment = datetime(2024, 3, 1, tzinfo=dt_timezone.utc)
+        positions = [
+            Position(id=1, latitude=55, longitude=37, date_time=moment, speed=0.0, distance=0.0),
+            Position(id=2 ** 31 + 1, latitude=55, longitude=37, date_time=moment, speed=0.0, distance=0.0),
+        ]
+        with self.assertRaisesMessage(ValueError, 'Track id delta does not fit into int32'):
+            RunTrackService.encode(positions)
+
+    def test_compacted_run_positions_are_unchanged(self):
+        athlete = User.objects.create(username='athlete')
+        run = Run.objects.create(athlete=athlete, status=Run.Status.IN_PROGRESS)
+        # The packed track keeps milliseconds.
+        start = timezone.now().replace(microsecond=250000)
+        PositionService.create_batch(run, [
+            {'latitude': Decimal('-22.9068') + Decimal('0.0003') * i, 'longitude': Decimal('-43.1729'),
+             'date_time': start + timedelta(seconds=5, milliseconds=10) * i}
+            for i in range(30)
+        ], pick_up=False)
+        run.status = Run.Status.FINISHED
+        run.save()
+        client = APIClient()
+
+        before = client.get(f'/api/positions/?run={run.id}').json()
+        self.assertEqual(RunTrackService.compact(run)[0], 30)
+        after = client.get(f'/api/positions/?run={run.id}').json()
+
+        self.assertTrue(RunTrack.objects.filter(run=run).exists())
+        self.assertFalse(Position.objects.filter(run=run).exists())
+        self.assertEqual(len(before), 30)
+        self.assertEqual(after, before)
+
+
+class PositionBulkTest(TestCase):
+    def test_malformed_items_are_reported_by_index(self):
+        run = Run.objects.create(athlete=User.objects.create(username='athlete'), status=Run.Status.IN_PROGRESS)
+
+        response = APIClient().post('/api/positions/bulk/', {'run': run.id, 'positions': [
+            {'latitude': 55.75, 'longitude': 37.62, 'date_time': timezone.now().isoformat()},
+            5,
+            ['55.75', '37.62'],
+            {'latitude': 555, 'longitude': 37.62, 'date_time': timezone.now().isoformat()},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2, 3])
+        self.assertIn('non_field_errors', response.data['errors'][0]['errors'])
+        self.assertIn('latitude', response.data['errors'][2]['errors'])
+        self.assertEqual(Position.objects.filter(run=run).count(), 1)
+
+
+class PositionWriterTest(TestCase):
+    @override_settings(POSITION_WRITER_WAIT_TIMEOUT=0)
+    def test_stop_is_refused_while_accepted_points_are_unwritten(self):
+        run = Run.objects.create(athlete=User.objects.create(username='athlete'), status=Run.Status.IN_PROGRESS)
+        # A batch the writer thread has taken off the queue but not written yet.
+        PositionWriterService._pending[run.id] += 3
+        self.addCleanup(PositionWriterService._done, run.id, 3)
+
+        response = APIClient().post(f'/api/runs/{run.id}/stop/')
+
+        self.assertEqual(response.status_code, 400)
+        run.refresh_from_db()
+        self.assertEqual(run.status, Run.Status.IN_PROGRESS)
+
+
+class ChallengeRuleTest(TestCase):
+    RULE = '2 километра за 10 минут!'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fast, cls.slow, cls.short = User.objects.bulk_create([
+            User(username='fast'), User(username='slow'), User(username='short')
+        ])
+        Run.objects.bulk_create([
+            Run(athlete=cls.fast, status=Run.Status.FINISHED, distance=2.4, run_time_seconds=580),
+            Run(athlete=cls.fast, status=Run.Status.FINISHED, distance=5.0, run_time_seconds=1800),
+            Run(athlete=cls.slow, status=Run.Status.FINISHED, distance=2.1, run_time_seconds=700),
+            Run(athlete=cls.short, status=Run.Status.FINISHED, distance=1.5, run_time_seconds=300),
+        ])
+        UserStatsService.rebuild()
+
+    def test_best_time_is_kept_in_stats(self):
+        self.assertEqual(UserStats.objects.get(user=self.fast).best_2km_time, 580)
+        self.assertIsNone(UserStats.objects.get(user=self.short).best_2km_time)
+
+        UserStatsService.record_finished_run(
+            Run(athlete=self.slow, status=Run.Status.FINISHED, distance=2.0, run_time_seconds=590)
+        )
+        self.assertEqual(UserStats.objects.get(user=self.slow).best_2km_time, 590)
+
+    def test_bulk_evaluation_reads_only_the_stats_table(self):
+        with CaptureQueriesContext(connection) as queries:
+            ChallengeRuleService.evaluate_all(ChallengeRuleService.get_rules([self.RULE]))
+
+        self.assertFalse([query for query in queries if Run._meta.db_table in query['sql']])
+        self.assertEqual(
+            list(Challenge.objects.filter(full_name=self.RULE).values_list('athlete_id', flat=True)), [self.fast.id]
+        )
+
+
+class TaskServiceTest(TestCase):
+    def setUp(self):
+        self.calls = []
+        self.failures = {}
+        TaskService.handler('test.record')(self.record)
+        self.addCleanup(TaskService.handlers.pop, 'test.record')
+
+    def record(self, value):
+        self.calls.append(value)
+        if self.failures.get(value, 0) > 0:
+            self.failures[value] -= 1
+            raise RuntimeError(f'{value} failed')
+
+    @staticmethod
+    def make_due(task):
+        Task.objects.filter(id=task.id).update(run_after=timezone.now())
+
+    def execute_failing(self):
+        with self.assertLogs('app_run.services.task_service', 'ERROR'):
+            self.assertFalse(TaskService.execute(TaskService.claim(limit=1)[0]))
+
+    def test_claims_one_task_per_key_in_order(self):
+        first = TaskService.enqueue('test.record', {'value': 'a1'}, ordering_key='a')
+        second = TaskService.enqueue('test.record', {'value': 'a2'}, ordering_key='a')
+        other = TaskService.enqueue('test.record', {'value': 'b1'}, ordering_key='b')
+
+        claimed = TaskService.claim(limit=10)
+        self.assertEqual([task.id for task in claimed], [first.id, other.id])
+        # The next task of a key waits until the one before it has finished.
+        self.assertEqual(TaskService.claim(limit=10), [])
+
+        for task in claimed:
+            self.assertTrue(TaskService.execute(task))
+        self.assertEqual([task.id for task in TaskService.claim(limit=10)], [second.id])
+        self.assertEqual(self.calls, ['a1', 'b1'])
+
+    def test_failed_task_is_retried_after_backoff(self):
+        self.failures['flaky'] = 1
+        task = TaskService.enqueue('test.record', {'value': 'flaky'}, ordering_key='a')
+        later = TaskService.enqueue('test.record', {'value': 'later'}, ordering_key='a')
+
+        self.execute_failing()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.Status.PENDING, 1))
+        self.assertIn('flaky failed', task.last_error)
+        self.assertGreater(task.run_after, timezone.now())
+        # Neither the task in backoff nor the one queued after it on the same key is due.
+        self.assertEqual(TaskService.claim(limit=10), [])
+
+        self.make_due(task)
+        self.assertTrue(TaskService.execute(TaskService.claim(limit=1)[0]))
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.Status.DONE, 2))
+        self.assertEqual([claimed.id for claimed in TaskService.claim(limit=10)], [later.id])
+
+    def test_task_fails_after_max_attempts(self):
+        self.failures['broken'] = 10
+        task = TaskService.enqueue('test.record', {'value': 'broken'}, max_attempts=2)
+
+        self.execute_failing()
+        self.make_due(task)
+        self.execute_failing()
+
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.Status.FAILED, 2))
+        self.make_due(task)
+        self.assertEqual(TaskService.claim(limit=10), [])
+        self.assertEqual(self.calls, ['broken', 'broken'])
+
+    def test_position_post_updates_totals_and_queues_only_the_pickup(self):
+        run = Run.objects.create(athlete=User.objects.create(username='athlete'), status=Run.Status.IN_PROGRESS)
+        client = APIClient()
+        start = timezone.now()
+
+        for i in range(2):
+            response = client.post('/api/positions/', {
+                'run': run.id, 'latitude': 55.75 + i * 0.001, 'longitude': 37.62,
+                'date_time': (start + timedelta(seconds=10 * i)).isoformat(),
+            }, format='json')
+            self.assertEqual(response.status_code, 201)
+
+        run.refresh_from_db()
+        self.assertEqual(run.positions_count, 2)
+        self.assertGreater(run.track_distance, 100)
+        self.assertEqual(
+            list(Task.objects.filter(ordering_key=f'run:{run.id}').values_list('name', flat=True).distinct()),
+            ['positions.pick_up']
+        )
+
+
+class RunDetailETagTest(TestCase):
+    def test_etag_follows_the_run_row(self):
+        run = Run.objects.create(athlete=User.objects.create(username='athlete'), status=Run.Status.IN_PROGRESS)
+        client = APIClient()
+
+        etag = client.get(f'/api/runs/{run.id}/')['ETag']
+        self.assertEqual(client.get(f'/api/runs/{run.id}/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.assertEqual(client.post(f'/api/runs/{run.id}/stop/').status_code, 200)
+        response = client.get(f'/api/runs/{run.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], Run.Status.FINISHED)
+
+        self.assertEqual(client.patch(f'/api/runs/{run.id}/', {'comment': 'edited'}, format='json').status_code, 200)
+        self.assertEqual(client.get(f'/api/runs/{run.id}/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+        self.assertFalse(ModelVersion.objects.filter(name__startswith='run:').exists())
+
+
+@override_settings(METRICS_SAMPLE_RATE=1.0)
+class RequestMetricsTest(TestCase):
+    ROUTE = 'api/analytics_for_coach/<int:coach_id>/export/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.coach = User.objects.create(username='coach', is_staff=True)
+        athlete = User.objects.create(username='athlete')
+        Subscribe.objects.create(athlete=athlete, coach=cls.coach)
+        run = Run.objects.create(athlete=athlete, status=Run.Status.FINISHED)
+        Position.objects.bulk_create([
+            Position(run=run, latitude=55, longitude=37, date_time=timezone.now() + timedelta(seconds=i))
+            for i in range(10)
+        ])
+
+    def setUp(self):
+        MetricsService.reset()
+        self.addCleanup(MetricsService.reset)
+
+    def test_streaming_response_is_recorded_once_sent(self):
+        response = APIClient().get(f'/api/analytics_for_coach/{self.coach.id}/export/')
+        self.assertNotIn((self.ROUTE, 'GET'), MetricsService._response_size)
+
+        body = b''.join(response.streaming_content)
+        response.close()
+
+        self.assertEqual(MetricsService._response_size[(self.ROUTE, 'GET')].total, len(body))
+        # The export queries run while the body is iterated.
+        self.assertGreaterEqual(MetricsService._queries[(self.ROUTE, 'GET')].total, 3)
+
+
+@skipUnless(replica_alias(), 'Needs a replica alias, e.g. DJANGO_SETTINGS_MODULE=project_run.settings.test')
+class ReplicaRoutingTest(TransactionTestCase):
+    # Not TestCase: the router keeps reads on the primary inside its per-test transaction.
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.item = CollectibleItem.objects.create(name='item', uid='uid', latitude=55, longitude=37,
+                                                   picture='https://example.com/item.png', value=1)
+
+    def test_read_only_viewset_reads_from_replica(self):
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get('/api/collectible_item/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        self.assertTrue(replica.captured_queries)
+
+    def test_client_reads_from_primary_after_a_write(self):
+        athlete = User.objects.create(username='athlete')
+        response = self.client.post('/api/runs/', {'athlete': athlete.id, 'comment': 'run'})
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(ReplicaStickinessMiddleware.COOKIE_NAME, response.cookies)
+
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get('/api/collectible_item/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(replica.captured_queries)
+
+    def test_reads_after_a_write_in_the_same_context_use_primary(self):
+        with request_scope(), use_replica():
+            self.assertEqual(CollectibleItem.objects.all().db, 'replica')
+            CollectibleItem.objects.filter(id=self.item.id).update(value=2)
+            self.assertEqual(CollectibleItem.objects.all().db, 'default')
@@ -1,20 +1,34 @@
-from rest_framework import viewsets, status
+import json
+
+from rest_framework import serializers, viewsets, status
 from rest_framework.views import APIView
 from rest_framework.filters import SearchFilter, OrderingFilter
 from rest_framework.pagination import PageNumberPagination
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, action
 from rest_framework.response import Response
 
 from django_filters.rest_framework import DjangoFilterBackend
 from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
 from django.contrib.auth.models import User
 
-from .models import Run, Position, CollectibleItem
-from .serializers import RunSerializer, UserSerializer, PositionSerializer, CollectibleItemSerializer
+from .db_router import use_replica
+from .models import Run, Position, CollectibleItem, RunTrack
+from .pagination import RunPagination, PositionPagination
+from .serializers import RunSerializer, UserSerializer, PositionSerializer, CollectibleItemSerializer, PositionBatchSerializer, PositionBatchItemSerializer
 
 from .services.run_service import RunService
 from .services.athlete_info_service import AthleteInfoService
 from .services.position_service import PositionService
+from .services.position_writer_service import PositionWriterService
+from .services.run_track_service import RunTrackService
+from .services.track_export_service import TrackExportService
+from .services.track_simplification_service import TrackSimplificationService
 from .services.collectible_item_service import CollectibleItemService
 from .services.subscribe_service import SubscribeService
 from .services.challenge_summary_service import ChallengeSummaryService
@@ -22,8 +36,25 @@ from .services.rating_service import RatingService
 from .services.analytic_service import AnalyticsService
 from .services.user_service import UserService
 from .services.challenge_service import ChallengeService
+from .services.metrics_service import MetricsService
+from .services.leaderboard_service import LeaderboardService
+from .services.model_version_service import ModelVersionService
+from .services.training_history_service import TrainingHistoryService
+from .services.coach_export_service import CoachExportService
+
+
+class ReplicaReadMixin:
+    """Serves the safe requests of a read-only viewset from the replica, see app_run.db_router."""
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            return super().dispatch(request, *args, **kwargs)
+        with use_replica():
+            return super().dispatch(request, *args, **kwargs)
 
 
+@ModelVersionService.conditional(
+    lambda request: [], salt=repr((settings.COMPANY_NAME, settings.SLOGAN, settings.CONTACTS))
+)
 @api_view(['GET'])
 def company_details(request):
     details = {
@@ -34,10 +65,6 @@ def company_details(request):
     return Response(details)
 
 
-class RunPagination(PageNumberPagination):
-    page_size_query_param = 'size'
-
-
 class RunViewSet(viewsets.ModelViewSet):
     queryset = Run.objects.all().select_related('athlete')
     serializer_class = RunSerializer
@@ -46,12 +73,100 @@ class RunViewSet(viewsets.ModelViewSet):
     filterset_fields = ['status', 'athlete']
     ordering_fields = ['created_at']
 
+    # Running totals are written with .update() and are not part of the representation.
+    REPRESENTED_FIELDS = [field.attname for field in Run._meta.concrete_fields if field.name not in Run.AGGREGATE_FIELDS]
+
+    @method_decorator(ModelVersionService.conditional(
+        lambda request, pk: ['user'],
+        state_func=lambda request, pk: list(Run.objects.filter(pk=pk).values_list(*RunViewSet.REPRESENTED_FIELDS))
+    ))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+
+@require_GET
+def run_track(request, id):
+    fmt = request.GET.get('format', 'polyline')
+    if fmt not in TrackExportService.CONTENT_TYPES:
+        return JsonResponse({'detail': f"Unknown format '{fmt}'"}, status=status.HTTP_400_BAD_REQUEST)
+    detail = request.GET.get('detail', TrackSimplificationService.FULL)
+    if detail not in TrackSimplificationService.DETAILS:
+        return JsonResponse({'detail': f"Unknown detail '{detail}'"}, status=status.HTTP_400_BAD_REQUEST)
+    run = get_object_or_404(Run.objects.only('id'), id=id)
+
+    rows = None
+    if detail != TrackSimplificationService.FULL:
+        rows = RunTrackService.as_rows(TrackSimplificationService.get_positions(run, detail))
+    return StreamingHttpResponse(
+        TrackExportService.stream(run.id, fmt, rows=rows),
+        content_type=TrackExportService.CONTENT_TYPES[fmt]
+    )
+
+
+@require_GET
+def export_coach_roster(request, coach_id):
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in CoachExportService.CONTENT_TYPES:
+        return JsonResponse({'detail': f"Unknown format '{fmt}'"}, status=status.HTTP_400_BAD_REQUEST)
+    gzip = request.GET.get('gzip') in ('1', 'true')
+    coach = get_object_or_404(User.objects.only('id'), id=coach_id)
+
+    filename = f'coach_{coach.id}_export.{fmt}' + ('.gz' if gzip else '')
+    response = StreamingHttpResponse(
+        CoachExportService.stream(coach.id, fmt, gzip=gzip),
+        content_type='application/gzip' if gzip else CoachExportService.CONTENT_TYPES[fmt]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@csrf_exempt
+@require_POST
+async def ingest_positions(request):
+    try:
+        payload = json.loads(request.body)
+        run_id = int(payload['run'])
+        raw_points = payload['positions']
+    except (ValueError, TypeError, KeyError):
+        return JsonResponse({'detail': 'Expected {"run": <id>, "positions": [...]}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+    if not isinstance(raw_points, list) or not 0 < len(raw_points) <= 1000:
+        return JsonResponse({'detail': 'positions must be a list of 1 to 1000 points'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    if not await Run.objects.filter(id=run_id, status=Run.Status.IN_PROGRESS).aexists():
+        return JsonResponse({'run': ['Отрпавить координаты можно только для забега в статусе "in_process"']},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    points, errors = [], []
+    for index, point in enumerate(raw_points):
+        serializer = PositionBatchItemSerializer(data=point)
+        if serializer.is_valid():
+            points.append(serializer.validated_data)
+        else:
+            errors.append({'index': index, 'errors': serializer.errors})
+
+    if not points:
+        return JsonResponse({'accepted': 0, 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+    if not PositionWriterService.enqueue(run_id, points):
+        response = JsonResponse({'detail': 'Ingestion queue is full, retry later'},
+                                status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        response['Retry-After'] = '1'
+        return response
+
+    return JsonResponse({'accepted': len(points), 'errors': errors}, status=status.HTTP_202_ACCEPTED)
+
+
+@require_GET
+def metrics(request):
+    return HttpResponse(MetricsService.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 
 class UserPagination(PageNumberPagination):
     page_size_query_param = 'size'
 
 
-class UserViewSet(viewsets.ReadOnlyModelViewSet):
+class UserViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     pagination_class = UserPagination
@@ -63,6 +178,12 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
         user_type = self.request.query_params.get('type', None)
         return UserService.get_filtered_users(user_type)
 
+    def get_object(self):
+        # get_serializer_class() needs the user too, so load and prefetch it only once.
+        if not hasattr(self, '_user'):
+            self._user = UserService.prefetch_profile(super().get_object())
+        return self._user
+
     def get_serializer_class(self):
         user = self.get_object() if self.action == 'retrieve' else None
         return UserService.get_serializer_for_user(user, self.action)
@@ -100,6 +221,7 @@ class AthleteInfoView(APIView):
 
 
 class ChallengeView(APIView):
+    @method_decorator(ModelVersionService.conditional(lambda request: ['challenge']))
     def get(self, request):
         athlete = request.query_params.get('athlete')
         qs = ChallengeService.get_challenges(athlete)
@@ -110,15 +232,71 @@ class ChallengeView(APIView):
 class PositionViewSet(viewsets.ModelViewSet):
     queryset = Position.objects.all()
     serializer_class = PositionSerializer
+    pagination_class = PositionPagination
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['run']
 
+    def list(self, request, *args, **kwargs):
+        run_id = request.query_params.get('run')
+        detail = request.query_params.get('detail', TrackSimplificationService.FULL)
+        if detail != TrackSimplificationService.FULL and str(run_id).isdigit():
+            try:
+                positions = TrackSimplificationService.get_positions(Run(id=int(run_id)), detail)
+            except ValueError as e:
+                return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return self._single_page(request, positions)
+
+        track = RunTrack.objects.filter(run_id=run_id).only('data').first() if str(run_id).isdigit() else None
+        if track is None:
+            return super().list(request, *args, **kwargs)
+        return self._single_page(request, RunTrackService.decode(track.data, run_id=int(run_id)))
+
+    def _single_page(self, request, positions):
+        # Compacted and simplified tracks are decoded whole; a paginated request gets them as a single page.
+        # Positions of compacted runs are only reachable here (compact_run_tracks is opt-in for that reason).
+        data = self.get_serializer(positions, many=True).data
+        if self.paginator.get_page_size(request) is not None:
+            return Response({'next': None, 'previous': None, 'results': data})
+        return Response(data)
+
     def perform_create(self, serializer):
-        position = serializer.save()
-        PositionService.update_collectibles_and_stats(position)
+        # The totals update is O(1) per fix and stays on the request path; only the pickup check is queued.
+        try:
+            with transaction.atomic():
+                position = serializer.save()
+                PositionService.update_collectibles_and_stats(position, defer_pick_up=True)
+        except RuntimeError as e:
+            # The run was stopped after validation; nothing was written.
+            raise serializers.ValidationError({'run': [str(e)]})
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        batch = PositionBatchSerializer(data=request.data)
+        batch.is_valid(raise_exception=True)
+        run = batch.validated_data['run']
+
+        points, errors = [], []
+        for index, point in enumerate(batch.validated_data['positions']):
+            serializer = PositionBatchItemSerializer(data=point)
+            if serializer.is_valid():
+                points.append(serializer.validated_data)
+            else:
+                errors.append({'index': index, 'errors': serializer.errors})
+
+        if not points:
+            return Response({'created': 0, 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
 
+        try:
+            positions = PositionService.create_batch(run, points, defer_pick_up=True)
+        except RuntimeError as e:
+            # The run was stopped after validation; nothing was written.
+            return Response({'run': [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'created': len(positions), 'errors': errors}, status=status.HTTP_201_CREATED)
 
-class CollectibleItemViewSet(viewsets.ReadOnlyModelViewSet):
+
+@method_decorator(ModelVersionService.conditional(lambda request, **kwargs: ['collectible_item']), name='list')
+@method_decorator(ModelVersionService.conditional(lambda request, **kwargs: ['collectible_item']), name='retrieve')
+class CollectibleItemViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     queryset = CollectibleItem.objects.all()
     serializer_class = CollectibleItemSerializer
 
@@ -129,9 +307,15 @@ class UploadFileView(APIView):
 
         if not uploaded_file:
             return Response({'detail': 'No file uploaded'}, status=400)
-        broken_rows = CollectibleItemService.import_from_excel(uploaded_file)
+        result = CollectibleItemService.import_from_excel(uploaded_file)
 
-        return Response(broken_rows)
+        return Response(result['broken_rows'], headers={
+            'X-Import-Rows': result['rows'],
+            'X-Import-Created': result['created'],
+            'X-Import-Updated': result['updated'],
+            'X-Import-Rows-Per-Second': result['rows_per_second'],
+            'X-Import-Peak-Memory-KB': result['peak_memory_kb'],
+        })
 
 
 class SubscribeView(APIView):
@@ -146,7 +330,13 @@ class SubscribeView(APIView):
 
 class ChallengeSummaryView(APIView):
     def get(self, request):
-        data = ChallengeSummaryService.get_grouped_challenges()
+        try:
+            data = ChallengeSummaryService.get_grouped_challenges(
+                limit=request.query_params.get('limit'),
+                offset=request.query_params.get('offset')
+            )
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         return Response(data)
 
 
@@ -161,6 +351,36 @@ class RatingView(APIView):
         return Response({'detail': result['success']})
 
 
+class LeaderboardView(APIView):
+    def get(self, request):
+        try:
+            data = LeaderboardService.get_leaderboard(
+                period=request.query_params.get('period', 'week'),
+                metric=request.query_params.get('metric', 'distance'),
+                coach_id=request.query_params.get('coach'),
+                on=request.query_params.get('date'),
+                limit=request.query_params.get('limit')
+            )
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
+
+
+class TrainingHistoryView(APIView):
+    def get(self, request, id):
+        athlete = get_object_or_404(User.objects.only('id'), id=id)
+        try:
+            data = TrainingHistoryService.get_history(
+                athlete.id,
+                date_from=request.query_params.get('from'),
+                date_to=request.query_params.get('to'),
+                bucket=request.query_params.get('bucket')
+            )
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
+
+
 class AnalyticView(APIView):
     def get(self, request, coach_id):
         data = AnalyticsService.get_coach_analytics(coach_id)
@@ -56,6 +56,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'app_run.middleware.RequestMetricsMiddleware',
+    'app_run.middleware.ReplicaStickinessMiddleware',
 ]
 
 ROOT_URLCONF = 'project_run.urls'
@@ -128,4 +130,30 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 #     'DEFAULT_PERMISSION_CLASSES': [
 #         'rest_framework.permissions.IsAuthenticated',
 #     ],
-# }
\ No newline at end of file
+# }
+
+# Background tasks (app_run.services.task_service). Run `manage.py run_tasks` to process the queue;
+# with TASKS_ALWAYS_EAGER tasks run right after the enqueuing transaction commits instead.
+TASKS_ALWAYS_EAGER = False
+
+
+# POST /api/positions/async/ queues points in memory (app_run.services.position_writer_service).
+# Stopping a run waits up to POSITION_WRITER_WAIT_TIMEOUT seconds for that run's queued points
+# and refuses the stop if they are still pending. Only the points of the process handling the stop
+# are seen, so serve the async endpoint and run stops from a single process (one ASGI worker).
+POSITION_WRITER_WAIT_TIMEOUT = 5.0
+
+
+# Share of requests recorded by app_run.middleware.RequestMetricsMiddleware, exposed at /api/metrics/.
+METRICS_SAMPLE_RATE = 0.1
+
+
+# s-maxage for responses served with ETags (app_run.services.model_version_service); browsers always revalidate.
+CDN_CACHE_MAX_AGE = 30
+
+
+# Reads inside app_run.db_router.use_replica() go to this alias when it is configured.
+# A client that wrote reads from default for REPLICA_STICKY_SECONDS afterwards.
+DATABASE_ROUTERS = ['app_run.db_router.ReplicaRouter']
+REPLICA_DATABASE = 'replica'
+REPLICA_STICKY_SECONDS = 10
@@ -12,9 +12,14 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD', 'db_pass'),
         'HOST': os.environ.get('DB_HOST', 'https://db_host_example.com'),
         'PORT': '5432',
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+if os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {**DATABASES['default'], 'HOST': os.environ['DB_REPLICA_HOST']}
+
 AWS_STORAGE_BUCKET_NAME = 'zappa-ymqd03cou'
 AWS_S3_CUSTOM_DOMAIN = f'{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com'
 AWS_S3_OBJECT_PARAMETERS = {